@@ -0,0 +1,184 @@
+import os
+from collections import OrderedDict
+import pygame
+
+# Sprites are packed into a few large atlas pages that are converted to the
+# display format once, so no blit ever converts pixels per frame. Scaled,
+# flipped and tinted variants are built on first use and kept in an LRU
+# bounded by bytes, so nothing scales on the fly either.
+
+SPRITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sprites")
+ATLAS_SIZE = 1024
+
+class AtlasPage:
+    # Shelf packer: sprites fill a row left to right, and a new row starts
+    # below the tallest sprite of the last one
+    def __init__(self, size, alpha):
+        # Pages are made in the display's format, so opaque ones never need
+        # converting; there's no format to copy for alpha, so those are
+        # converted once
+        screen = pygame.display.get_surface()
+        if screen is None:
+            self.surface = pygame.Surface((size, size), pygame.SRCALPHA if alpha else 0)
+        elif alpha:
+            self.surface = pygame.Surface((size, size), pygame.SRCALPHA).convert_alpha()
+        else:
+            self.surface = pygame.Surface((size, size), 0, screen)
+        self.alpha = alpha
+        self.size = size
+        self.shelf_x = self.shelf_y = self.shelf_height = 0
+    
+    def pack(self, width, height):
+        if self.shelf_x + width > self.size:
+            self.shelf_x = 0
+            self.shelf_y += self.shelf_height
+            self.shelf_height = 0
+        if self.shelf_x + width > self.size or self.shelf_y + height > self.size:
+            return None
+        rect = pygame.Rect(self.shelf_x, self.shelf_y, width, height)
+        self.shelf_x += width
+        self.shelf_height = max(self.shelf_height, height)
+        return rect
+
+class AssetManager:
+    def __init__(self, max_variant_bytes=32 * 1024 * 1024):
+        self.pages = []
+        self.regions = {}  # name -> (page, rect)
+        self.sprites = {}  # name -> subsurface of its page
+        
+        self.variants = OrderedDict()
+        self.variant_bytes = 0
+        self.max_variant_bytes = max_variant_bytes
+    
+    def _convert(self, surface, alpha):
+        # Conversion needs a display mode; without one surfaces stay as-is
+        if pygame.display.get_surface() is None:
+            return surface
+        return surface.convert_alpha() if alpha else surface.convert()
+    
+    def add(self, name, surface):
+        # Copies a sprite into an atlas page matching its alpha, replacing
+        # any sprite of the same name. Colorkeyed sprites share the opaque
+        # pages, which blit far faster than per-pixel alpha.
+        alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+        colorkey = None if alpha else surface.get_colorkey()
+        width, height = surface.get_size()
+        size = max(ATLAS_SIZE, width, height)
+        rect = None
+        for page in self.pages:
+            if page.alpha == alpha:
+                rect = page.pack(width, height)
+                if rect:
+                    break
+        if rect is None:
+            page = AtlasPage(size, alpha)
+            self.pages.append(page)
+            rect = page.pack(width, height)
+        
+        page.surface.fill(colorkey or (0, 0, 0, 0), rect)
+        page.surface.blit(surface, rect, special_flags=pygame.BLEND_RGBA_ADD if alpha else 0)
+        sprite = page.surface.subsurface(rect)
+        if colorkey:
+            sprite.set_colorkey(colorkey)
+        self.regions[name] = (page, rect)
+        self.sprites[name] = sprite
+        self._drop_variants(name)
+    
+    def load_sheet(self, path, frames):
+        # frames maps sprite names to (x, y, width, height) within the sheet
+        sheet = pygame.image.load(path)
+        alpha = bool(sheet.get_flags() & pygame.SRCALPHA)
+        sheet = self._convert(sheet, alpha)
+        for name, rect in frames.items():
+            self.add(name, sheet.subsurface(rect))
+    
+    def load_manifest(self, path):
+        # {"image": "player.png", "frames": {"player": [0, 0, 70, 60], ...}},
+        # with the image relative to the manifest
+        import json
+        with open(path) as f:
+            manifest = json.load(f)
+        self.load_sheet(os.path.join(os.path.dirname(path), manifest["image"]), manifest["frames"])
+    
+    def load_all(self, directory=SPRITE_DIR):
+        if not os.path.isdir(directory):
+            return
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(".json"):
+                self.load_manifest(os.path.join(directory, filename))
+    
+    def get(self, name, size=None, flip_x=False, tint=None):
+        sprite = self.sprites[name]
+        if size is not None and size == sprite.get_size():
+            size = None
+        if size is None and not flip_x and tint is None:
+            return sprite
+        
+        key = (name, size, flip_x, tint)
+        variant = self.variants.get(key)
+        if variant is not None:
+            self.variants.move_to_end(key)
+            return variant
+        
+        # Smoothing would blend the key color into a colorkeyed sprite's edges
+        colorkey = sprite.get_colorkey()
+        variant = sprite
+        if size is not None:
+            if variant.get_bitsize() >= 24 and not colorkey:
+                variant = pygame.transform.smoothscale(variant, size)
+            else:
+                variant = pygame.transform.scale(variant, size)
+        if flip_x:
+            variant = pygame.transform.flip(variant, True, False)
+        if tint is not None:
+            variant = variant.copy()
+            variant.fill(tint, special_flags=pygame.BLEND_RGB_MULT)
+        if variant is sprite:
+            variant = sprite.copy()
+        if colorkey:
+            # Tinting leaves a black key black; RLE makes the blits cheaper
+            variant.set_colorkey(colorkey, pygame.RLEACCEL)
+        
+        self.variants[key] = variant
+        self.variant_bytes += self._bytes(variant)
+        while self.variant_bytes > self.max_variant_bytes and len(self.variants) > 1:
+            _, old = self.variants.popitem(last=False)
+            self.variant_bytes -= self._bytes(old)
+        return variant
+    
+    def _bytes(self, surface):
+        width, height = surface.get_size()
+        return width * height * surface.get_bytesize()
+    
+    def _drop_variants(self, name):
+        for key in [key for key in self.variants if key[0] == name]:
+            self.variant_bytes -= self._bytes(self.variants.pop(key))
+
+def add_placeholders(assets):
+    # Stand-in art drawn in code until real sheets exist; a manifest frame
+    # with the same name replaces it
+    player = pygame.Surface((70, 60), pygame.SRCALPHA)
+    player.fill((100, 200, 100), (0, 0, 40, 60))
+    player.fill((150, 150, 150), (40, 20, 30, 10))  # Weapon
+    assets.add("player", player)
+    
+    for name, size, color in (("enemy_basic", 50, (200, 50, 50)),
+                              ("enemy_flying", 50, (50, 50, 200)),
+                              ("enemy_tank", 50, (150, 50, 150)),
+                              ("boss", 100, (180, 50, 180))):
+        sprite = pygame.Surface((size, size))
+        sprite.fill(color)
+        assets.add(name, sprite)
+    
+    # Health bars are tinted, stretched copies of one white pixel
+    bar = pygame.Surface((1, 1))
+    bar.fill((255, 255, 255))
+    assets.add("bar", bar)
+    
+    # White on a black key, so bullets of any color are tinted variants of
+    # one sprite
+    bullet = pygame.Surface((65, 65))
+    pygame.draw.circle(bullet, (255, 255, 255), (32, 32), 32)
+    bullet.set_colorkey((0, 0, 0))
+    assets.add("bullet", bullet)
+    assets.add("spark", bullet)
@@ -0,0 +1,236 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import numpy as np
+from game.core import Game
+from game.enemies import Enemy
+from game.net import capture, encode
+from game.profiler import AllocationTracer
+from game.replay import ReplayInput, read_seed
+
+# Deterministic benchmark scenarios. Every run seeds `random` before the
+# Game is built, so enemy spawns, patrol timers and boss patterns repeat
+# exactly from run to run. Recorded replays can be passed as scenarios too.
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# Allowed growth over the baseline before a metric counts as a regression:
+# the larger of a fraction of the baseline and an absolute floor, so tiny
+# baselines don't fail on noise
+DEFAULT_THRESHOLDS = {
+    "p50_ms": {"relative": 0.15, "absolute": 0.05},
+    "p95_ms": {"relative": 0.25, "absolute": 0.10},
+    "p99_ms": {"relative": 0.50, "absolute": 0.25},
+    "alloc_blocks_per_frame": {"relative": 0.50, "absolute": 1.0},
+    "net_bytes_per_tick": {"relative": 0.10, "absolute": 16},
+}
+
+def setup_basic_enemies(game, rng, count=200):
+    game.enemy_store.clear()
+    for i in range(count):
+        Enemy(game, rng.uniform(0, game.level.width - 50), 600, "basic")
+
+def setup_horde(game, rng, count=500):
+    game.enemy_store.clear()
+    for i in range(count):
+        enemy_type = "flying" if i % 3 == 0 else "basic"
+        Enemy(game, rng.uniform(0, game.level.width - 50), rng.uniform(100, 600), enemy_type)
+
+def setup_projectiles(game, rng, count=2000):
+    game.projectile_target = count
+
+def top_up_projectiles(game, rng):
+    # Keeps the live bullet count constant as bullets expire or leave the view
+    pool = game.projectiles
+    while pool.count < game.projectile_target:
+        pool.spawn(rng.uniform(0, game.screen_width), rng.uniform(0, game.screen_height),
+                   rng.uniform(-6, 6), rng.uniform(-6, 6), 1, 4, (255, 255, 0),
+                   lifetime=rng.randint(30, 180))
+
+def setup_boss_phase_3(game, rng):
+    game.current_level = 3
+    game.load_level(3)
+    game.boss.health = game.boss.max_health * 0.25
+
+def setup_bullet_hell(game, rng):
+    setup_boss_phase_3(game, rng)
+
+def keep_boss_firing(game, rng):
+    # Phase 3 volleys every 10 frames instead of every 60
+    boss = game.boss
+    boss.pattern_timer = min(boss.pattern_timer, 10)
+
+def clear_level_periodically(game, rng):
+    # Kill everything every 30 frames so the level keeps transitioning,
+    # with most spawns marked dead a little earlier the way real play
+    # thins a level out before it's cleared
+    level = game.level
+    if game.frame % 30 == 10:
+        level.killed.update(range(int(level.enemy_total * 0.8)))
+    if game.frame % 30 == 29:
+        game.enemy_store.health[:game.enemy_store.count] = 0
+        level.killed.update(range(level.enemy_total))
+
+SCENARIOS = {
+    "basic_enemies": (setup_basic_enemies, None),
+    "horde": (setup_horde, None),
+    "projectiles": (setup_projectiles, top_up_projectiles),
+    "boss_phase_3": (setup_boss_phase_3, None),
+    "bullet_hell": (setup_bullet_hell, keep_boss_firing),
+    "level_transition": (None, clear_level_periodically),
+}
+
+def start_scenario(name, frames, seed):
+    # Returns the game set up for a scenario, its per-frame hook, the rng
+    # the hooks draw from, and how many frames it runs for. A scenario
+    # name that is a path to a replay file runs that session.
+    if os.path.isfile(name):
+        setup = per_frame = None
+        game = Game(headless=True, seed=read_seed(name))
+        game.input = ReplayInput(game, name)
+        frames = min(frames, len(game.input))
+    else:
+        setup, per_frame = SCENARIOS[name]
+        game = Game(headless=True, seed=seed)
+        game.player.invulnerable = True
+    rng = random.Random(seed)
+    if setup:
+        setup(game, rng)
+    return game, per_frame, rng, frames
+
+def measure_net(name, frames=600, seed=1234):
+    # Bytes per tick of each tick's server snapshot as a delta on the one
+    # before, as a client acknowledging every snapshot would get it. This is
+    # a pass of its own, without drawing, so encoding never lands in the
+    # timed frames or their GC counts; scenarios replay exactly, so it sees
+    # the same ticks.
+    game, per_frame, rng, frames = start_scenario(name, frames, seed)
+    net_bytes = 0
+    state = capture(game)
+    for i in range(frames):
+        if per_frame:
+            per_frame(game, rng)
+        game.step()
+        base, state = state, capture(game)
+        net_bytes += len(encode(i + 2, state, i + 1, base))
+    return net_bytes / frames
+
+def run_scenario(name, frames=600, seed=1234, render=True, tracer=None):
+    game, per_frame, rng, frames = start_scenario(name, frames, seed)
+    times = np.zeros(frames, dtype=np.int64)
+    blocks = np.zeros(frames, dtype=np.int64)
+    collections = [0]
+    def on_gc(phase, info):
+        if phase == "start":
+            collections[0] += 1
+    gc.callbacks.append(on_gc)
+    if tracer:
+        tracer.start()
+    try:
+        for i in range(frames):
+            if per_frame:
+                per_frame(game, rng)
+            if tracer:
+                tracer.begin_frame()
+            before = sys.getallocatedblocks()
+            start = time.perf_counter_ns()
+            game.step()
+            if render:
+                game.render()
+            times[i] = time.perf_counter_ns() - start
+            game.particles.budget(times[i] / 1e9)
+            blocks[i] = sys.getallocatedblocks() - before
+            if tracer:
+                tracer.end_frame()
+    finally:
+        gc.callbacks.remove(on_gc)
+        if tracer:
+            tracer.stop()
+    
+    ms = times / 1e6
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99)).tolist()
+    return {
+        "frames": frames,
+        "p50_ms": round(p50, 4),
+        "p95_ms": round(p95, 4),
+        "p99_ms": round(p99, 4),
+        "max_ms": round(float(ms.max()), 4),
+        # Net memory blocks held after each frame, and GC passes triggered
+        "alloc_blocks_per_frame": round(float(blocks.mean()), 2),
+        "gc_per_1k_frames": round(collections[0] * 1000 / frames, 2),
+        "net_bytes_per_tick": round(measure_net(name, frames, seed), 1),
+    }
+
+def compare(results, baseline, thresholds):
+    # Returns one message per metric that grew past its allowed threshold
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric, allowed in thresholds.items():
+            if metric not in base:
+                continue
+            limit = base[metric] + max(abs(base[metric]) * allowed["relative"], allowed["absolute"])
+            if result[metric] > limit:
+                regressions.append(f"{name}.{metric}: {result[metric]} > {limit:.4f} "
+                                   f"(baseline {base[metric]})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run deterministic gameplay benchmarks")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS),
+                        help=f"scenarios or replay files to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--no-render", action="store_true", help="time update() only")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write these results as the new baseline instead of comparing")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="report allocations by call site after each scenario (timings "
+                             "are not comparable, so nothing is checked against the baseline)")
+    args = parser.parse_args()
+    
+    results = {}
+    print(f"{'scenario':<18}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'blocks/f':>10}{'gc/1k':>8}{'B/tick':>9}")
+    for name in args.scenarios:
+        tracer = AllocationTracer(args.frames) if args.trace_alloc else None
+        result = run_scenario(name, args.frames, args.seed, not args.no_render, tracer)
+        results[name] = result
+        print(f"{name:<18}{result['p50_ms']:>9.3f}{result['p95_ms']:>9.3f}{result['p99_ms']:>9.3f}"
+              f"{result['max_ms']:>9.3f}{result['alloc_blocks_per_frame']:>10.1f}"
+              f"{result['gc_per_1k_frames']:>8.1f}{result['net_bytes_per_tick']:>9.0f}")
+        if tracer:
+            for line in tracer.report():
+                print(f"    {line}")
+    if args.trace_alloc:
+        return 0
+    
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"thresholds": DEFAULT_THRESHOLDS, "frames": args.frames,
+                       "seed": args.seed, "scenarios": results}, f, indent=4)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    
+    # A gate that can't find its baseline fails rather than passing
+    # silently; recording one is the explicit --save-baseline
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one on this machine with --save-baseline")
+        return 1
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, baseline.get("thresholds", DEFAULT_THRESHOLDS))
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import math
+import random
+from game import patterns
+from game.enemies import Enemy
+from game.particles import PHASE_COLOR
+from game.render import LAYER_BOSS, LAYER_LABELS
+
+# Only imported once a boss level is reached
+
+class Boss(Enemy):
+    bullet_color = (255, 80, 255)
+    
+    def __init__(self, game, x, y, boss_type):
+        super().__init__(game, x, y, "tank")  # Inherit from tank stats
+        self.boss_type = boss_type
+        self.width, self.height = 100, 100
+        self.health = 500
+        self.max_health = self.health
+        self.phase = 1
+        self.attack_pattern = 0
+        self.pattern_timer = 0
+        
+        # Boss-specific attacks share the game's enemy bullet pool
+        self.projectiles = game.enemy_projectiles
+    
+    def update(self):
+        # Boss AI with different phases
+        if self.health < self.max_health * 0.3:
+            phase = 3
+        elif self.health < self.max_health * 0.6:
+            phase = 2
+        else:
+            phase = 1
+        if phase != self.phase:
+            self.phase = phase
+            self.game.particles.emit(self.x + self.width / 2, self.y + self.height / 2,
+                                     120, PHASE_COLOR, speed=9.0, lifetime=60, size=5)
+        
+        # Different behaviors per phase
+        if self.phase == 1:
+            # Simple movement
+            if self.game.player.x < self.x:
+                self.vel_x = -self.speed
+            else:
+                self.vel_x = self.speed
+            
+            self.x += self.vel_x
+            
+            # Basic attack
+            if self.pattern_timer <= 0:
+                self.perform_attack()
+                self.pattern_timer = 120
+            else:
+                self.pattern_timer -= 1
+        
+        elif self.phase == 2:
+            # More aggressive
+            self.speed = 2
+            if self.pattern_timer <= 0:
+                self.attack_pattern = (self.attack_pattern + 1) % 3
+                self.perform_attack()
+                self.pattern_timer = 90
+            else:
+                self.pattern_timer -= 1
+        
+        elif self.phase == 3:
+            # Final phase - very aggressive
+            self.speed = 3
+            if self.pattern_timer <= 0:
+                self.attack_pattern = random.randint(0, 4)
+                self.perform_attack()
+                self.pattern_timer = 60
+            else:
+                self.pattern_timer -= 1
+    
+    def perform_attack(self):
+        # Later phases fire denser volleys of the same patterns
+        center_x = self.x + self.width / 2
+        center_y = self.y + self.height / 2
+        player = self.game.player
+        aim = math.atan2(player.y + player.height / 2 - center_y,
+                         player.x + player.width / 2 - center_x)
+        density = self.phase
+        
+        if self.attack_pattern == 0:
+            # Aimed burst of heavy shots
+            volley, damage, size = patterns.aimed(aim, 2 + density), 20, 12
+        elif self.attack_pattern == 1:
+            # Spread shot
+            volley, damage, size = patterns.spread(aim, 1 + 4 * density, 0.5 + 0.25 * density), 10, 8
+        elif self.attack_pattern == 2:
+            # Ring
+            volley, damage, size = patterns.ring(12 * density, 5, aim), 10, 8
+        elif self.attack_pattern == 3:
+            # Spiral
+            volley, damage, size = patterns.spiral(2 + 2 * density, 8 * density, offset=aim), 10, 6
+        else:
+            # Two interleaved rings at different speeds
+            volley = patterns.combine(patterns.ring(16 * density, 4, aim),
+                                      patterns.ring(16 * density, 6, aim + math.pi / (16 * density)))
+            damage, size = 10, 6
+        patterns.fire(self.projectiles, center_x, center_y, volley, damage, size, self.bullet_color)
+    
+    def draw(self, queue):
+        x, y = queue.lerp(self.prev_x, self.x), queue.lerp(self.prev_y, self.y)
+        queue.submit(LAYER_BOSS, queue.assets.get("boss", (int(self.width), int(self.height))), x, y)
+        queue.health_bar(x - 50, y - 30, 200, 20, self.health / self.max_health)
+        
+        # Phase indicator
+        text = self.game.ui.text.render(30, f"Phase {self.phase}", (255, 255, 255))
+        queue.submit(LAYER_LABELS, text, x, y - 50)
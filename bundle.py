@@ -0,0 +1,76 @@
+import argparse
+import importlib.util
+import marshal
+import os
+import struct
+import sys
+import tempfile
+import zipfile
+from game.assets import SPRITE_DIR
+from game.levels import LEVEL_DIR, compile_level
+
+# Packs the runtime game package into one zip of precompiled bytecode and
+# compiled levels, so the browser build mounts everything in a single fetch
+# instead of importing and compiling each module from source.
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(PACKAGE_DIR, "dist", "game.zip")
+
+# Modules the game needs at runtime; tools like bench and sweep stay out
+RUNTIME_MODULES = ("__init__", "core", "player", "enemies", "boss", "levels", "weapons",
+                   "shop", "patterns", "ui", "assets", "render", "collision", "profiler",
+                   "replay", "snapshot", "particles")
+
+# Bytecode only loads on the interpreter version that wrote it, so this
+# has to follow the Python that index.html's Pyodide release ships
+TARGET_PYTHON = (3, 11)
+
+def compile_module(path, arcname, optimize):
+    with open(path, "rb") as f:
+        source = f.read()
+    code = compile(source, arcname, "exec", dont_inherit=True, optimize=optimize)
+    # Unchecked hash-based header: the loader never looks for a source file
+    return (importlib.util.MAGIC_NUMBER + struct.pack("<I", 0b01) +
+            importlib.util.source_hash(source) + marshal.dumps(code))
+
+def build(output, optimize=2):
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+        for module in RUNTIME_MODULES:
+            archive.writestr(f"game/{module}.pyc",
+                             compile_module(os.path.join(PACKAGE_DIR, f"{module}.py"),
+                                            f"game/{module}.py", optimize))
+        
+        # Level sources first and compiled levels after, so an unpacked
+        # .lvl is never older than its .json and doesn't get rebuilt
+        levels = sorted(f[:-5] for f in os.listdir(LEVEL_DIR) if f.endswith(".json"))
+        for name in levels:
+            archive.write(os.path.join(LEVEL_DIR, f"{name}.json"), f"game/level_data/{name}.json")
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in levels:
+                compiled = os.path.join(tmp, f"{name}.lvl")
+                compile_level(os.path.join(LEVEL_DIR, f"{name}.json"), compiled)
+                archive.write(compiled, f"game/level_data/{name}.lvl")
+        
+        # Sprite sheets and their manifests, once artists have added some
+        if os.path.isdir(SPRITE_DIR):
+            for filename in sorted(os.listdir(SPRITE_DIR)):
+                archive.write(os.path.join(SPRITE_DIR, filename), f"game/sprites/{filename}")
+    return os.path.getsize(output)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the single-archive web bundle")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--optimize", type=int, default=2, choices=(0, 1, 2))
+    args = parser.parse_args()
+    
+    if sys.version_info[:2] != TARGET_PYTHON:
+        print(f"Bytecode must be built with Python {'.'.join(map(str, TARGET_PYTHON))} "
+              f"to load in the browser, not {sys.version.split()[0]}")
+        return 1
+    size = build(args.output, args.optimize)
+    print(f"Wrote {args.output} ({size / 1024:.1f} KiB)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import numpy as np
+
+# Uniform-grid broadphase over arrays of boxes. Every box is bucketed into
+# each cell it touches, cells are matched by sorted key, and only boxes
+# sharing a cell get the exact overlap test.
+
+
+def _cell_keys(x, y, width, height, cell_size):
+    x0 = np.floor_divide(x, cell_size).astype(np.int64)
+    y0 = np.floor_divide(y, cell_size).astype(np.int64)
+    nx = np.floor_divide(x + width, cell_size).astype(np.int64) - x0 + 1
+    ny = np.floor_divide(y + height, cell_size).astype(np.int64) - y0 + 1
+    
+    # Expand each box into one (owner, cell) row per covered cell
+    counts = nx * ny
+    owner = np.repeat(np.arange(len(x)), counts)
+    local = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = x0[owner] + local % nx[owner]
+    cy = y0[owner] + local // nx[owner]
+    return owner, (cx << 32) + cy
+
+
+def box_pairs(a_boxes, b_boxes, cell_size=128):
+    # Returns index arrays (a, b) of every overlapping pair between two sets
+    # of (x, y, width, height) arrays
+    ax, ay, aw, ah = a_boxes
+    bx, by, bw, bh = b_boxes
+    empty = np.zeros(0, dtype=np.intp)
+    if not len(ax) or not len(bx):
+        return empty, empty
+    
+    a_owner, a_keys = _cell_keys(ax, ay, aw, ah, cell_size)
+    b_owner, b_keys = _cell_keys(bx, by, bw, bh, cell_size)
+    order = np.argsort(b_keys, kind="stable")
+    b_owner, b_keys = b_owner[order], b_keys[order]
+    
+    # Join the two sets on cell key
+    starts = np.searchsorted(b_keys, a_keys, "left")
+    lens = np.searchsorted(b_keys, a_keys, "right") - starts
+    total = int(lens.sum())
+    if not total:
+        return empty, empty
+    a = np.repeat(a_owner, lens)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lens) - lens, lens)
+    b = b_owner[np.repeat(starts, lens) + offsets]
+    
+    # Boxes sharing several cells show up more than once
+    _, first = np.unique(a * len(bx) + b, return_index=True)
+    a, b = a[first], b[first]
+    
+    hit = ((ax[a] < bx[b] + bw[b]) & (ax[a] + aw[a] > bx[b]) &
+           (ay[a] < by[b] + bh[b]) & (ay[a] + ah[a] > by[b]))
+    return a[hit], b[hit]
@@ -1,66 +1,151 @@
+import os
+import random
+import time
+import numpy as np
 import pygame
 import sys
 from game.player import Player  # Changed from relative to absolute
-from game.enemies import Enemy, Boss
-from game.levels import Level
-from game.weapons import Weapon, WeaponShop
+from game.enemies import EnemyStore
+from game.levels import Level, Camera
+from game.weapons import Weapon, ProjectilePool
+from game.particles import ParticleSystem, HIT_COLOR, PLAYER_HIT_COLOR, DEATH_COLOR
 from game.ui import HealthBar, UIManager
+from game.assets import AssetManager, add_placeholders
+from game.render import RenderQueue
+from game.collision import box_pairs
+from game.profiler import FrameProfiler
+from game.replay import LiveInput
+from game.snapshot import save_state, load_state
+
+# The simulation ticks at Game.fps whatever the display does; frames are
+# drawn up to MAX_FPS times a second, interpolated between the last two
+# ticks. A frame runs at most MAX_TICKS_PER_FRAME ticks to catch up.
+MAX_FPS = 144
+MAX_TICKS_PER_FRAME = 5
 
 class Game:
-    def __init__(self):
-        pygame.init()
+    def __init__(self, headless=False, dirty_rects=False, seed=None, assets=None):
+        # Headless mode runs on the SDL dummy driver so no display is needed
+        self.headless = headless
+        
+        # All gameplay randomness comes from the global random module, so
+        # one seed plus the input log reproduces a session
+        if seed is None:
+            seed = int.from_bytes(os.urandom(4), "little")
+        self.seed = seed
+        random.seed(seed)
+        
+        # Dirty-rect mode presents only the regions that changed each frame
+        self.dirty_rects = dirty_rects
+        self.last_rects = []
+        self.last_camera = None
+        self.full_redraw = True
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+        
+        # Only the display is started here; fonts start with the first text
+        # drawn, and nothing uses the mixer or joysticks
+        pygame.display.init()
         self.screen_width, self.screen_height = 1280, 720
         self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
         pygame.display.set_caption("Advanced Platformer")
         
+        # Sprites are converted for this display once, up front. Games in
+        # one process can share a set, as server sessions do.
+        if assets is None:
+            assets = AssetManager()
+            add_placeholders(assets)
+            assets.load_all()
+        self.assets = assets
+        self.render_queue = RenderQueue(self.assets)
+        
         self.clock = pygame.time.Clock()
+        self.input = LiveInput()
+        self.profiler = FrameProfiler()
+        self.fps = 60  # Simulation ticks per second
+        self.max_fps = MAX_FPS
+        self.frame = 0
+        self.lag = 0.0  # Real time not yet simulated
+        self.alpha = 1.0  # Where the frame being drawn sits between ticks
+        self.teleported = False  # Nothing to interpolate from this tick
         self.running = True
         self.game_paused = False
         
         # Game systems
+        self.camera = Camera(self.screen_width, self.screen_height)
         self.level = Level(self)
         self.player = Player(self, 100, 500)
-        self.weapon_shop = WeaponShop(self)
+        self._weapon_shop = None
         self.ui = UIManager(self)
         
         # Game state
         self.current_level = 1
         self.coins = 0
         self.score = 0
-        self.checkpoint_position = (100, 500)
+        self.deaths = 0
+        self.checkpoint_position = None
+        self.respawn_state = None
+        self.quick_save = None
         
         # Game objects
-        self.projectiles = []
-        self.enemies = []
+        self.projectiles = ProjectilePool()
+        self.enemy_projectiles = ProjectilePool()
+        self.particles = ParticleSystem(seed=seed)
+        self.enemy_store = EnemyStore(self)
+        self.enemies = self.enemy_store.enemies
         
         # Load first level
         self.load_level(self.current_level)
     
     def load_level(self, level_num):
-        self.level.load(f"level_{level_num}")
+        # Enemies register themselves in the store as their chunks stream in
+        self.enemy_store.clear()
+        self.level.load(self.level.level_name(level_num))
+        if self.checkpoint_position is None:
+            self.checkpoint_position = self.level.spawn
         self.player.reset_position(*self.checkpoint_position)
-        self.spawn_enemies()
+        self.level.stream()
         
+        if hasattr(self, 'boss'):
+            del self.boss
         if level_num % 3 == 0:
             self.spawn_boss()
         
-        self.projectiles = []
+        self.projectiles.clear()
+        self.enemy_projectiles.clear()
+        self.particles.clear()
+        self.full_redraw = True
+        self.teleported = True
+        self.save_checkpoint()
     
-    def spawn_enemies(self):
-        self.enemies = []
-        for i in range(5):
-            self.enemies.append(Enemy(self, 300 + i*150, 600, "basic"))
-        
-        if self.current_level > 1:
-            for i in range(3):
-                self.enemies.append(Enemy(self, 200 + i*200, 300, "flying"))
+    
+    def snapshot(self):
+        # The whole simulation as one compact buffer; see game.snapshot
+        return save_state(self)
+    
+    def restore(self, state):
+        load_state(self, state)
+        self.particles.clear()
+        self.teleported = True
+    
+    def save_checkpoint(self):
+        # Dying restores this instead of rebuilding the level
+        self.respawn_state = self.snapshot()
+    
+    @property
+    def weapon_shop(self):
+        # The shop module is imported and built the first time it's needed
+        if self._weapon_shop is None:
+            from game.shop import WeaponShop
+            self._weapon_shop = WeaponShop(self)
+        return self._weapon_shop
     
     def spawn_boss(self):
+        from game.boss import Boss
         self.boss = Boss(self, 800, 400, f"boss_{self.current_level//3}")
-        self.enemies.append(self.boss)
     
     def handle_events(self):
-        for event in pygame.event.get():
+        for event in self.input.events:
             if event.type == pygame.QUIT:
                 self.running = False
             
@@ -71,55 +156,320 @@ class Game:
                     self.player.shoot()
                 if event.key == pygame.K_e and not self.game_paused:
                     self.weapon_shop.toggle_shop()
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle_overlay()
+                if event.key == pygame.K_F5:
+                    self.quick_save = self.snapshot()
+                if event.key == pygame.K_F9 and self.quick_save:
+                    self.restore(self.quick_save)
     
     def update(self):
         if self.game_paused:
             return
-            
+        
+        profiler = self.profiler
         self.player.update()
+        profiler.mark("player")
         
-        for enemy in self.enemies[:]:
-            enemy.update()
-            if enemy.health <= 0:
-                self.coins += enemy.coin_value
-                self.score += enemy.score_value
-                self.enemies.remove(enemy)
+        self.enemy_store.update()
+        profiler.mark("enemies")
         
-        for projectile in self.projectiles[:]:
-            projectile.update()
-            if projectile.lifetime <= 0:
-                self.projectiles.remove(projectile)
+        # Bullets are allowed a small margin past the camera view
+        camera = self.camera
+        bounds = (camera.x - 100, camera.y - 100,
+                  camera.x + camera.width + 100, camera.y + camera.height + 100)
+        self.projectiles.update(bounds)
+        self.enemy_projectiles.update(bounds)
+        
+        self.handle_collisions()
+        
+        # Death bursts, read before the dead are swap-removed
+        store = self.enemy_store
+        n = store.count
+        dead = store.health[:n] <= 0
+        if dead.any():
+            self.particles.emit(store.x[:n][dead] + store.width[:n][dead] / 2,
+                                store.y[:n][dead] + store.height[:n][dead] / 2,
+                                24, DEATH_COLOR, speed=6.0, lifetime=40, size=4)
+        for enemy in store.remove_dead():
+            self.coins += enemy.coin_value
+            self.score += enemy.score_value
+            self.level.enemy_killed(enemy)
+            if enemy is getattr(self, 'boss', None):
+                del self.boss
+        
+        self.projectiles.remove_dead()
+        self.enemy_projectiles.remove_dead()
+        self.particles.update()
+        profiler.mark("projectiles")
         
         self.level.update()
+        profiler.mark("level_update")
         
-        if len(self.enemies) == 0 and not hasattr(self, 'boss'):
+        if self.player.health <= 0:
+            self.game_over()
+        
+        if (len(self.enemies) == 0 and self.level.enemies_remaining == 0 and
+                not hasattr(self, 'boss')):
             self.current_level += 1
+            self.checkpoint_position = None
             self.load_level(self.current_level)
     
-    def render(self):
-        self.screen.fill((30, 30, 40))
-        self.level.draw(self.screen)
+    def handle_collisions(self):
+        store = self.enemy_store
         
-        for projectile in self.projectiles:
-            projectile.draw(self.screen)
+        # Player projectiles vs enemies, tested along each bullet's path this
+        # frame so fast bullets can't tunnel through
+        projectiles = self.projectiles
+        if projectiles.count and store.count:
+            bullets, hit = box_pairs(projectiles.swept_boxes(), store.boxes())
+            if bullets.size:
+                # A bullet only damages the first enemy it touches: pairs
+                # are ordered by how far along the bullet's path this tick
+                # it reaches the enemy's near edge, then deduplicated
+                vel_x, vel_y = projectiles.vel_x[bullets], projectiles.vel_y[bullets]
+                start_x = projectiles.x[bullets] - vel_x
+                start_y = projectiles.y[bullets] - vel_y
+                left, top = store.x[hit], store.y[hit]
+                right, bottom = left + store.width[hit], top + store.height[hit]
+                entry = (np.where(vel_x >= 0, left - start_x, start_x - right) * (vel_x != 0) +
+                         np.where(vel_y >= 0, top - start_y, start_y - bottom) * (vel_y != 0))
+                order = np.lexsort((entry, bullets))
+                bullets, hit = bullets[order], hit[order]
+                bullets, first = np.unique(bullets, return_index=True)
+                store.take_damage(hit[first], projectiles.damage[bullets])
+                projectiles.lifetime[bullets] = 0
+                self.particles.emit(projectiles.x[bullets], projectiles.y[bullets], 6, HIT_COLOR)
         
-        self.player.draw(self.screen)
-        for enemy in self.enemies:
-            enemy.draw(self.screen)
+        # Enemy contact with the player
+        player = self.player
+        store.touch_player(player)
+        
+        # Enemy projectiles vs player
+        bullets = self.enemy_projectiles
+        if bullets.count:
+            hits = bullets.query(player.x, player.y, player.width, player.height)
+            if hits.size:
+                player.take_damage(int(bullets.damage[hits].sum()))
+                bullets.lifetime[hits] = 0
+                self.particles.emit(bullets.x[hits], bullets.y[hits], 6, PLAYER_HIT_COLOR)
+    
+    def game_over(self):
+        # Respawn from the last checkpoint's snapshot, keeping what was
+        # earned since, the damage taken and the running frame count.
+        # Enemies killed since stay dead, so their coins can't be earned
+        # twice. That includes the boss, which the checkpoint always holds
+        # since it spawns with the level.
+        coins, score, deaths, frame = self.coins, self.score, self.deaths + 1, self.frame
+        damage_taken = self.player.damage_taken
+        killed = self.level.killed
+        boss_killed = not hasattr(self, 'boss')
+        self.restore(self.respawn_state)
+        self.coins, self.score, self.deaths, self.frame = coins, score, deaths, frame
+        self.player.damage_taken = damage_taken
+        self.player.health = self.player.max_health
+        self.level.remove_killed(killed)
+        if boss_killed and hasattr(self, 'boss'):
+            self.enemy_store.remove(self.boss)
+            del self.boss
+    
+    def render(self, alpha=1.0):
+        # Damage rects come from simulation positions, so dirty-rect mode
+        # draws the last tick as it is
+        if self.dirty_rects:
+            self.render_dirty()
+            return
+        
+        # The camera is moved to the drawn position only while drawing, so
+        # the simulation never sees it
+        camera = self.camera
+        view = (camera.x, camera.y)
+        if not self.teleported:
+            self.alpha = alpha
+            camera.x, camera.y = camera.interpolate(alpha)
         
+        profiler = self.profiler
+        self.level.draw(self.screen)
+        profiler.mark("level_draw")
+        self.draw_entities()
+        profiler.mark("entities_draw")
         self.ui.draw(self.screen)
         
         if self.game_paused:
             self.ui.draw_pause_menu()
+        profiler.draw(self.screen, self.ui.text)
+        profiler.mark("ui_draw")
         
         pygame.display.flip()
+        profiler.mark("flip")
+        camera.x, camera.y = view
+        self.alpha = 1.0
+    
+    def draw_entities(self):
+        # Entities queue sprites in world space; the queue culls them to the
+        # view and draws everything in a few batched calls
+        queue = self.render_queue
+        queue.begin(self.camera, self.alpha)
+        self.projectiles.draw(queue)
+        self.enemy_projectiles.draw(queue)
+        self.player.draw(queue)
+        self.enemy_store.draw(queue)
+        self.particles.draw(queue)
+        queue.flush(self.screen)
+    
+    def render_dirty(self):
+        screen = self.screen
+        level = self.level
+        camera = self.camera
+        if (camera.x, camera.y) != self.last_camera:
+            # A scrolled view invalidates everything on screen
+            self.full_redraw = True
+            self.last_camera = (camera.x, camera.y)
+        
+        profiler = self.profiler
+        if self.full_redraw or self.game_paused or profiler.overlay:
+            self.level.draw(screen)
+            profiler.mark("level_draw")
+            self.draw_entities()
+            profiler.mark("entities_draw")
+            self.ui.draw(screen)
+            if self.game_paused:
+                self.ui.draw_pause_menu()
+            profiler.draw(screen, self.ui.text)
+            profiler.mark("ui_draw")
+            pygame.display.flip()
+            profiler.mark("flip")
+            self.last_rects = [screen.get_rect()]
+            self.full_redraw = self.game_paused
+            return
+        
+        # Erase last frame's sprites, and the HUD strip so its translucent
+        # text isn't blended over itself
+        for rect in self.last_rects:
+            level.erase(screen, rect)
+        hud_rect = self.ui.hud_surface.get_rect()
+        level.erase(screen, hud_rect)
+        
+        rects = level.draw_dynamic(screen)
+        profiler.mark("level_draw")
+        self.draw_entities()
+        profiler.mark("entities_draw")
+        hud_changed = self.ui.hud_state != self.ui._hud_state()
+        self.ui.draw(screen)
+        
+        # Health bars and labels sit above and around each sprite, and the
+        # player's weapon reaches 30 px past its box on the side it faces
+        rects.append(pygame.Rect(self.player.x - camera.x - 30, self.player.y - camera.y - 20,
+                                 self.player.width + 60, self.player.height + 20))
+        for enemy in self.enemies:
+            rects.append(pygame.Rect(enemy.x - camera.x - 50, enemy.y - camera.y - 50,
+                                     enemy.width + 100, enemy.height + 50))
+        offset = (camera.x, camera.y)
+        rects.extend(self.projectiles.rects(offset))
+        rects.extend(self.enemy_projectiles.rects(offset))
+        rects.extend(self.particles.rects(offset))
+        if hud_changed:
+            rects.append(hud_rect)
+        
+        # Past a few hundred regions a single flip is cheaper
+        profiler.mark("ui_draw")
+        if len(rects) + len(self.last_rects) > 300:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.last_rects + rects)
+        profiler.mark("flip")
+        self.last_rects = rects
+    
+    def save_positions(self):
+        # Where things were before this tick, for interpolated drawing
+        player = self.player
+        player.prev_x, player.prev_y = player.x, player.y
+        self.enemy_store.save_positions()
+        for platform in self.level.moving_platforms:
+            platform.prev_x = platform.x
+        camera = self.camera
+        camera.prev_x, camera.prev_y = camera.x, camera.y
+        self.teleported = False
+    
+    def step(self):
+        # One fixed simulation tick
+        self.input.poll()
+        if not self.running:
+            return
+        self.save_positions()
+        self.handle_events()
+        self.profiler.mark("events")
+        self.update()
+        self.frame += 1
+    
+    def simulate(self, frames):
+        # Step the simulation as fast as the CPU allows, without rendering
+        start = self.frame
+        profiler = self.profiler
+        while self.running and self.frame - start < frames:
+            profiler.begin_frame()
+            self.step()
+            profiler.end_frame()
+        return self.frame - start
+    
+    def tick(self):
+        # One tick and a frame showing it, when there is a display
+        profiler = self.profiler
+        profiler.begin_frame()
+        start = time.perf_counter()
+        self.step()
+        if not self.headless:
+            self.render()
+        self.particles.budget(time.perf_counter() - start)
+        profiler.end_frame()
+    
+    def advance(self, elapsed):
+        # Runs the ticks that elapsed seconds of real time add up to, then
+        # draws a frame part way to the next. Time past MAX_TICKS_PER_FRAME
+        # is dropped, so a long stall slows the game down for a moment
+        # rather than freezing it while it catches up.
+        tick_time = 1 / self.fps
+        self.lag = min(self.lag + elapsed, tick_time * MAX_TICKS_PER_FRAME)
+        profiler = self.profiler
+        profiler.begin_frame()
+        start = time.perf_counter()
+        while self.lag >= tick_time and self.running:
+            self.step()
+            self.lag -= tick_time
+        if not self.headless:
+            self.render(self.lag / tick_time)
+        self.particles.budget(time.perf_counter() - start)
+        profiler.end_frame()
     
     def run(self):
+        last = time.perf_counter()
         while self.running:
-            self.handle_events()
-            self.update()
-            self.render()
-            self.clock.tick(60)
+            now = time.perf_counter()
+            self.advance(now - last)
+            last = now
+            self.clock.tick(self.max_fps)
+        
+        pygame.quit()
+        sys.exit()
+    
+    async def run_async(self):
+        # Same frames as run(), but instead of blocking in clock.tick the
+        # rest of each frame's budget is handed back to the event loop, so a
+        # browser page keeps its thread. asyncio is imported here since it
+        # costs desktop startup more than the rest of the game modules
+        import asyncio
+        frame_time = 1 / self.max_fps
+        last = next_frame = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            self.advance(now - last)
+            last = now
+            next_frame += frame_time
+            delay = next_frame - time.perf_counter()
+            if delay < 0:
+                # Running behind: start a fresh schedule rather than bursting
+                next_frame = time.perf_counter()
+                delay = 0
+            await asyncio.sleep(delay)
         
         pygame.quit()
-        sys.exit()
\ No newline at end of file
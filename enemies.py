@@ -1,189 +1,327 @@
-import pygame
+import numpy as np
 import random
+from game.render import LAYER_ENEMIES
 
-class Enemy:
-    def __init__(self, game, x, y, enemy_type):
+# Archetype table shared by every enemy of a type
+ENEMY_TYPES = {
+    "basic": {"health": 30, "speed": 2, "damage": 10, "coin_value": 5, "score_value": 100},
+    "flying": {"health": 20, "speed": 3, "damage": 5, "coin_value": 3, "score_value": 150},
+    "tank": {"health": 100, "speed": 1, "damage": 20, "coin_value": 10, "score_value": 200}
+}
+TYPE_NAMES = list(ENEMY_TYPES)
+TYPE_IDS = {name: i for i, name in enumerate(TYPE_NAMES)}
+BASIC, FLYING, TANK = TYPE_IDS["basic"], TYPE_IDS["flying"], TYPE_IDS["tank"]
+
+# AI level of detail. Enemies within NEAR_MARGIN of the camera view think
+# every frame; the rest think every LOD_INTERVAL frames, staggered so an
+# equal share is due each frame, and coast on their last velocity in
+# between. At most MAX_FAR_UPDATES distant enemies think per frame. The
+# budget counts updates rather than time so replays stay deterministic.
+NEAR_MARGIN = 200
+LOD_INTERVAL = 4
+MAX_FAR_UPDATES = 128
+
+
+class EnemyStore:
+    # Contiguous per-enemy state. Slots [0, count) are live and line up with
+    # self.enemies; Enemy objects are thin handles onto a slot.
+    FIELDS = {
+        "x": np.float64, "y": np.float64,
+        "prev_x": np.float64, "prev_y": np.float64,  # as of the last tick, for drawing
+        "vel_x": np.float64, "vel_y": np.float64,
+        "width": np.float64, "height": np.float64,
+        "health": np.float64, "max_health": np.float64,
+        "speed": np.float64,
+        "attack_cooldown": np.int32,
+        "direction": np.int32,
+        "move_timer": np.int32,
+        "type_id": np.int32,
+        "lod_phase": np.int32,
+        "last_update": np.int32,
+    }
+    
+    def __init__(self, game, capacity=256):
         self.game = game
-        self.x, self.y = x, y
-        self.type = enemy_type
-        self.width, self.height = 50, 50
-        self.vel_x, self.vel_y = 0, 0
+        self.capacity = capacity
+        self.count = 0
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
         
-        # Enemy stats
-        self.stats = {
-            "basic": {"health": 30, "speed": 2, "damage": 10, "coin_value": 5, "score_value": 100},
-            "flying": {"health": 20, "speed": 3, "damage": 5, "coin_value": 3, "score_value": 150},
-            "tank": {"health": 100, "speed": 1, "damage": 20, "coin_value": 10, "score_value": 200}
-        }
+        # Per-type columns of the archetype table
+        self.type_damage = np.array([ENEMY_TYPES[t]["damage"] for t in TYPE_NAMES], dtype=np.float64)
         
-        self.health = self.stats[enemy_type]["health"]
-        self.max_health = self.health
-        self.speed = self.stats[enemy_type]["speed"]
-        self.damage = self.stats[enemy_type]["damage"]
-        self.coin_value = self.stats[enemy_type]["coin_value"]
-        self.score_value = self.stats[enemy_type]["score_value"]
+        # Handles by slot, and enemies that run their own update()
+        self.enemies = []
+        self.custom = []
         
-        # AI behavior
-        self.direction = random.choice([-1, 1])
-        self.move_timer = 0
-        self.attack_cooldown = 0
+        # Phases are dealt out in turn, so a wave spawned at once still
+        # thinks spread over LOD_INTERVAL frames
+        self.next_phase = 0
     
-    def update(self):
-        if self.attack_cooldown > 0:
-            self.attack_cooldown -= 1
-            
-        # Different behaviors based on type
-        if self.type == "basic":
-            self.vel_x = self.direction * self.speed
-            self.move_timer -= 1
-            if self.move_timer <= 0:
-                self.direction *= -1
-                self.move_timer = random.randint(60, 180)
-            
-            # Simple platform collision
-            self.x += self.vel_x
-            for platform in self.game.level.platforms:
-                if (self.x <= platform.x + platform.width and 
-                    self.x + self.width >= platform.x and
-                    self.y + self.height >= platform.y and 
-                    self.y < platform.y):
-                    self.y = platform.y - self.height
-                    self.vel_y = 0
-                elif (self.x + self.width > platform.x + platform.width or 
-                      self.x < platform.x) and self.move_timer <= 0:
-                    self.direction *= -1
-                    self.move_timer = random.randint(60, 180)
-        
-        elif self.type == "flying":
-            # Fly towards player
-            if self.game.player.x < self.x:
-                self.vel_x = -self.speed
-            else:
-                self.vel_x = self.speed
-                
-            if self.game.player.y < self.y:
-                self.vel_y = -self.speed
-            else:
-                self.vel_y = self.speed
-                
-            self.x += self.vel_x
-            self.y += self.vel_y
+    def _grow(self):
+        self.capacity *= 2
+        for name in self.FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(self.capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+    
+    def add(self, enemy, x, y, enemy_type):
+        if self.count == self.capacity:
+            self._grow()
+        i = self.count
+        stats = ENEMY_TYPES[enemy_type]
+        self.x[i], self.y[i] = x, y
+        self.prev_x[i], self.prev_y[i] = x, y
+        self.vel_x[i] = self.vel_y[i] = 0
+        self.width[i] = self.height[i] = 50
+        self.health[i] = self.max_health[i] = stats["health"]
+        self.speed[i] = stats["speed"]
+        self.attack_cooldown[i] = 0
+        self.direction[i] = random.choice([-1, 1])
+        self.move_timer[i] = 0
+        self.type_id[i] = TYPE_IDS[enemy_type]
+        self.lod_phase[i] = self.next_phase
+        self.last_update[i] = self.game.frame
+        self.next_phase = (self.next_phase + 1) % LOD_INTERVAL
         
-        # Check collision with player
-        if (abs(self.game.player.x - self.x) < self.width and 
-            abs(self.game.player.y - self.y) < self.height and 
-            self.attack_cooldown == 0):
-            self.game.player.take_damage(self.damage)
-            self.attack_cooldown = 60
+        enemy.index = i
+        self.enemies.append(enemy)
+        if hasattr(enemy, 'update'):
+            self.custom.append(enemy)
+        self.count += 1
     
-    def take_damage(self, amount):
-        self.health -= amount
+    def clear(self):
+        self.count = 0
+        for enemy in self.enemies:
+            enemy.index = None
+        self.enemies.clear()
+        self.custom.clear()
     
-    def draw(self, screen):
-        # Draw enemy (rectangle for now)
-        if self.type == "basic":
-            color = (200, 50, 50)  # Red
-        elif self.type == "flying":
-            color = (50, 50, 200)  # Blue
-        else:
-            color = (150, 50, 150)  # Purple
-            
-        pygame.draw.rect(screen, color, (self.x, self.y, self.width, self.height))
-        
-        # Draw health bar
-        health_ratio = self.health / self.max_health
-        pygame.draw.rect(screen, (255, 0, 0), (self.x, self.y - 15, self.width, 5))
-        pygame.draw.rect(screen, (0, 255, 0), (self.x, self.y - 15, self.width * health_ratio, 5))
-
-class Boss(Enemy):
-    def __init__(self, game, x, y, boss_type):
-        super().__init__(game, x, y, "tank")  # Inherit from tank stats
-        self.boss_type = boss_type
-        self.width, self.height = 100, 100
-        self.health = 500
-        self.max_health = self.health
-        self.phase = 1
-        self.attack_pattern = 0
-        self.pattern_timer = 0
+    def remove(self, enemy):
+        # Swap-removes one enemy, keeping slots packed
+        i = enemy.index
+        last = self.count - 1
+        enemies = self.enemies
+        if i != last:
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                array[i] = array[last]
+            enemies[i] = enemies[last]
+            enemies[i].index = i
+        enemies.pop()
+        self.count = last
+        enemy.index = None
+        if enemy in self.custom:
+            self.custom.remove(enemy)
+    
+    def remove_dead(self):
+        # Removes every enemy at or below zero health and returns them
+        dead = np.flatnonzero(self.health[:self.count] <= 0)
+        if not dead.size:
+            return []
+        removed = []
+        for i in dead[::-1].tolist():
+            enemy = self.enemies[i]
+            self.remove(enemy)
+            removed.append(enemy)
+        return removed
+    
+    def save_positions(self):
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+    
+    def boxes(self):
+        n = self.count
+        return self.x[:n], self.y[:n], self.width[:n], self.height[:n]
+    
+    def take_damage(self, indices, amounts):
+        np.subtract.at(self.health, indices, amounts)
+    
+    def _schedule(self, n, frame):
+        # Mask of the slots that think this frame
+        camera = self.game.camera
+        x, y = self.x[:n], self.y[:n]
+        near = ((x + self.width[:n] > camera.x - NEAR_MARGIN) &
+                (x < camera.x + camera.width + NEAR_MARGIN) &
+                (y + self.height[:n] > camera.y - NEAR_MARGIN) &
+                (y < camera.y + camera.height + NEAR_MARGIN))
+        phase = self.lod_phase[:n]
+        due = ~near & (phase == frame % LOD_INTERVAL)
         
-        # Boss-specific attacks
-        self.projectiles = []
+        # Over budget: the rest move to the next frame's share
+        due_idx = np.flatnonzero(due)
+        if due_idx.size > MAX_FAR_UPDATES:
+            late = due_idx[MAX_FAR_UPDATES:]
+            due[late] = False
+            phase[late] = (phase[late] + 1) % LOD_INTERVAL
+        return near | due
     
     def update(self):
-        # Boss AI with different phases
-        if self.health < self.max_health * 0.3:
-            self.phase = 3
-        elif self.health < self.max_health * 0.6:
-            self.phase = 2
-        else:
-            self.phase = 1
+        n = self.count
+        custom = self.custom
+        if n:
+            frame = self.game.frame
+            cooldown = self.attack_cooldown[:n]
+            cooldown[cooldown > 0] -= 1
+            
+            think = self._schedule(n, frame)
+            plain = np.ones(n, dtype=bool)
+            for enemy in custom:
+                plain[enemy.index] = False
             
-        # Different behaviors per phase
-        if self.phase == 1:
-            # Simple movement
-            if self.game.player.x < self.x:
-                self.vel_x = -self.speed
-            else:
-                self.vel_x = self.speed
-                
-            self.x += self.vel_x
+            # Enemies that don't think this frame keep their last velocity.
+            # Custom enemies run their own logic, so they just wait.
+            coast = plain & ~think
+            if coast.any():
+                self.x[:n] += np.where(coast, self.vel_x[:n], 0)
+                self.y[:n] += np.where(coast, self.vel_y[:n], 0)
             
-            # Basic attack
-            if self.pattern_timer <= 0:
-                self.perform_attack()
-                self.pattern_timer = 120
-            else:
-                self.pattern_timer -= 1
-                
-        elif self.phase == 2:
-            # More aggressive
-            self.speed = 2
-            if self.pattern_timer <= 0:
-                self.attack_pattern = (self.attack_pattern + 1) % 3
-                self.perform_attack()
-                self.pattern_timer = 90
-            else:
-                self.pattern_timer -= 1
-                
-        elif self.phase == 3:
-            # Final phase - very aggressive
-            self.speed = 3
-            if self.pattern_timer <= 0:
-                self.attack_pattern = random.randint(0, 4)
-                self.perform_attack()
-                self.pattern_timer = 60
-            else:
-                self.pattern_timer -= 1
+            type_id = self.type_id[:n]
+            basic = np.flatnonzero(think & (type_id == BASIC))
+            if basic.size:
+                self._update_basic(basic, frame - self.last_update[basic])
+            flying = np.flatnonzero(think & (type_id == FLYING))
+            if flying.size:
+                self._update_flying(flying)
+            self.last_update[:n][think] = frame
+            custom = [enemy for enemy in custom if think[enemy.index]]
         
-        # Update projectiles
-        for proj in self.projectiles[:]:
-            proj.update()
-            if proj.lifetime <= 0:
-                self.projectiles.remove(proj)
-    
-    def perform_attack(self):
-        if self.attack_pattern == 0:
-            # Single powerful shot
-            pass
-        elif self.attack_pattern == 1:
-            # Spread shot
-            pass
-        elif self.attack_pattern == 2:
-            # Circular pattern
-            pass
-    
-    def draw(self, screen):
-        # Draw boss (bigger rectangle)
-        color = (180, 50, 180)  # Purple
-        pygame.draw.rect(screen, color, (self.x, self.y, self.width, self.height))
+        for enemy in custom:
+            enemy.update()
+    
+    def _update_basic(self, idx, elapsed):
+        # Patrol back and forth, turning around when the move timer runs out.
+        # Timers count down every frame since this enemy last thought.
+        vel_x = self.direction[idx] * self.speed[idx]
+        move_timer = self.move_timer[idx] - elapsed
+        turn = move_timer <= 0
+        if turn.any():
+            self.direction[idx[turn]] *= -1
+            move_timer[turn] = [random.randint(60, 180) for _ in range(int(turn.sum()))]
+        self.move_timer[idx] = move_timer
         
-        # Draw health bar
-        health_ratio = self.health / self.max_health
-        pygame.draw.rect(screen, (255, 0, 0), (self.x - 50, self.y - 30, 200, 20))
-        pygame.draw.rect(screen, (0, 255, 0), (self.x - 50, self.y - 30, 200 * health_ratio, 20))
+        # Simple platform collision, one vectorized test per platform
+        x = self.x[idx] + vel_x
+        y = self.y[idx]
+        vel_y = self.vel_y[idx]
+        width, height = self.width[idx], self.height[idx]
+        for platform in self.game.level.platforms:
+            on = ((x <= platform.x + platform.width) & (x + width >= platform.x) &
+                  (y + height >= platform.y) & (y < platform.y))
+            y = np.where(on, platform.y - height, y)
+            vel_y = np.where(on, 0, vel_y)
         
-        # Draw phase indicator
-        phase_text = f"Phase {self.phase}"
-        font = pygame.font.SysFont(None, 30)
-        text = font.render(phase_text, True, (255, 255, 255))
-        screen.blit(text, (self.x, self.y - 50))
\ No newline at end of file
+        self.vel_x[idx] = vel_x
+        self.x[idx] = x
+        self.y[idx] = y
+        self.vel_y[idx] = vel_y
+    
+    def _update_flying(self, idx):
+        # Fly towards player
+        player = self.game.player
+        speed = self.speed[idx]
+        x, y = self.x[idx], self.y[idx]
+        vel_x = np.where(player.x < x, -speed, speed)
+        vel_y = np.where(player.y < y, -speed, speed)
+        self.vel_x[idx] = vel_x
+        self.vel_y[idx] = vel_y
+        self.x[idx] = x + vel_x
+        self.y[idx] = y + vel_y
+    
+    def draw(self, queue):
+        # Enemies with their own logic draw themselves; the rest go out as
+        # one batch per sprite plus one batch of health bars
+        n = self.count
+        if not n:
+            return
+        plain = np.ones(n, dtype=bool)
+        for enemy in self.custom:
+            plain[enemy.index] = False
+            enemy.draw(queue)
+        
+        x = queue.lerp(self.prev_x[:n], self.x[:n])
+        y = queue.lerp(self.prev_y[:n], self.y[:n])
+        width, height = self.width[:n], self.height[:n]
+        type_id = self.type_id[:n]
+        for t, w, h in set(zip(type_id[plain].tolist(), width[plain].tolist(), height[plain].tolist())):
+            same = plain & (type_id == t) & (width == w) & (height == h)
+            sprite = queue.assets.get(f"enemy_{TYPE_NAMES[t]}", (int(w), int(h)))
+            queue.submit_many(LAYER_ENEMIES, sprite, x[same], y[same])
+        queue.health_bars(x[plain], y[plain] - 15, width[plain], 5,
+                          self.health[:n][plain] / self.max_health[:n][plain])
+    
+    def touch_player(self, player):
+        # Contact damage from every enemy overlapping the player
+        n = self.count
+        if not n:
+            return
+        cooldown = self.attack_cooldown[:n]
+        touching = np.flatnonzero((np.abs(player.x - self.x[:n]) < self.width[:n]) &
+                                  (np.abs(player.y - self.y[:n]) < self.height[:n]) &
+                                  (cooldown == 0))
+        if touching.size:
+            player.take_damage(float(self.type_damage[self.type_id[touching]].sum()))
+            cooldown[touching] = 60
+
+
+class _Field:
+    # Reads and writes an enemy's slot in the store
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, enemy, owner=None):
+        if enemy is None:
+            return self
+        return getattr(enemy.store, self.name).item(enemy.index)
+    
+    def __set__(self, enemy, value):
+        getattr(enemy.store, self.name)[enemy.index] = value
+
+
+class Enemy:
+    stats = ENEMY_TYPES
+    
+    x = _Field()
+    y = _Field()
+    prev_x = _Field()
+    prev_y = _Field()
+    vel_x = _Field()
+    vel_y = _Field()
+    width = _Field()
+    height = _Field()
+    health = _Field()
+    max_health = _Field()
+    speed = _Field()
+    attack_cooldown = _Field()
+    direction = _Field()
+    move_timer = _Field()
+    
+    def __init__(self, game, x, y, enemy_type):
+        # Constructing an enemy allocates its slot in the game's store
+        self.game = game
+        self.type = enemy_type
+        self.store = game.enemy_store
+        self.store.add(self, x, y, enemy_type)
+    
+    @property
+    def damage(self):
+        return self.stats[self.type]["damage"]
+    
+    @property
+    def coin_value(self):
+        return self.stats[self.type]["coin_value"]
+    
+    @property
+    def score_value(self):
+        return self.stats[self.type]["score_value"]
+    
+    def take_damage(self, amount):
+        self.health -= amount
+    
+    def draw(self, queue):
+        x, y = queue.lerp(self.prev_x, self.x), queue.lerp(self.prev_y, self.y)
+        sprite = queue.assets.get(f"enemy_{self.type}", (int(self.width), int(self.height)))
+        queue.submit(LAYER_ENEMIES, sprite, x, y)
+        queue.health_bar(x, y - 15, self.width, 5, self.health / self.max_health)
@@ -1,5 +1,32 @@
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
 import pygame
-import random
+from game.enemies import Enemy, TYPE_IDS, TYPE_NAMES
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "level_data")
+
+# Compiled level layout (little-endian):
+#   header, moving platform records, chunk table, then per-chunk
+#   platform, checkpoint and enemy records at each chunk's offset.
+# Chunks are read straight out of an mmap so only nearby ones are ever
+# parsed, however large the level is.
+LEVEL_MAGIC = b"WPGL"
+LEVEL_VERSION = 1
+HEADER = struct.Struct("<4sHHiiiiBBBxII")
+MOVING_RECORD = struct.Struct("<10i")
+CHUNK_RECORD = struct.Struct("<6i")
+PLATFORM_RECORD = struct.Struct("<7i")
+CHECKPOINT_RECORD = struct.Struct("<2i")
+ENEMY_RECORD = struct.Struct("<4i")
+
+# Parsed levels kept around by name, and baked chunk surfaces per level
+TEMPLATE_CACHE_SIZE = 4
+TEMPLATE_SURFACES = 48
+# Share of a level's spawns left when the next level starts preloading
+PRELOAD_REMAINING = 0.25
 
 class Platform:
     def __init__(self, x, y, width, height, color=(150, 150, 150)):
@@ -7,8 +34,25 @@ class Platform:
         self.width, self.height = width, height
         self.color = color
     
-    def draw(self, screen):
-        pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
+    def draw(self, screen, offset=(0, 0)):
+        pygame.draw.rect(screen, self.color,
+                         (self.x - offset[0], self.y - offset[1], self.width, self.height))
+    
+    def rect(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+class MovingPlatform(Platform):
+    def __init__(self, x, y, width, height, color, min_x, max_x, speed):
+        super().__init__(x, y, width, height, color)
+        self.min_x, self.max_x = min_x, max_x
+        self.speed = speed
+        self.direction = 1
+        self.prev_x = x
+    
+    def update(self):
+        self.x += self.speed * self.direction
+        if self.x > self.max_x or self.x < self.min_x:
+            self.direction *= -1
 
 class Checkpoint:
     def __init__(self, x, y):
@@ -17,93 +61,463 @@ class Checkpoint:
         self.active = False
         self.color = (0, 255, 255)  # Cyan
     
-    def draw(self, screen):
+    def draw(self, screen, offset=(0, 0)):
         color = (0, 200, 200) if self.active else (0, 150, 150)
-        pygame.draw.rect(screen, color, (self.x, self.y, self.width, self.height))
+        pygame.draw.rect(screen, color,
+                         (self.x - offset[0], self.y - offset[1], self.width, self.height))
+    
+    def rect(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+
+def compile_level(source_path, output_path):
+    # Converts a JSON level into the chunked binary format. Platforms that
+    # cross a chunk boundary are split so each chunk is self-contained.
+    # json is only needed here, and levels are usually compiled already.
+    import json
+    import tempfile
+    with open(source_path) as f:
+        data = json.load(f)
+    
+    size = data["chunk_size"]
+    width, height = data["width"], data["height"]
+    columns, rows = -(-width // size), -(-height // size)
+    chunks = {(cx, cy): ([], [], []) for cx in range(columns) for cy in range(rows)}
+    
+    for platform in data["platforms"]:
+        x, y, w, h = platform[:4]
+        color = platform[4] if len(platform) > 4 else (150, 150, 150)
+        for cx in range(x // size, (x + w - 1) // size + 1):
+            for cy in range(y // size, (y + h - 1) // size + 1):
+                left, top = max(x, cx * size), max(y, cy * size)
+                right = min(x + w, (cx + 1) * size)
+                bottom = min(y + h, (cy + 1) * size)
+                chunks.setdefault((cx, cy), ([], [], []))[0].append(
+                    (left, top, right - left, bottom - top, *color))
+    
+    for x, y in data["checkpoints"]:
+        chunks.setdefault((x // size, y // size), ([], [], []))[1].append((x, y))
+    
+    for spawn_id, (x, y, enemy_type) in enumerate(data["enemies"]):
+        chunks.setdefault((x // size, y // size), ([], [], []))[2].append(
+            (spawn_id, x, y, TYPE_IDS[enemy_type]))
+    
+    moving = [(*m["rect"], *m.get("color", (200, 100, 100)),
+               m["min_x"], m["max_x"], m.get("speed", 2))
+              for m in data.get("moving_platforms", [])]
+    
+    offset = HEADER.size + MOVING_RECORD.size * len(moving) + CHUNK_RECORD.size * len(chunks)
+    table, body = [], []
+    for (cx, cy), (platforms, checkpoints, enemies) in sorted(chunks.items()):
+        table.append(CHUNK_RECORD.pack(cx, cy, offset, len(platforms), len(checkpoints), len(enemies)))
+        for record, items in ((PLATFORM_RECORD, platforms), (CHECKPOINT_RECORD, checkpoints),
+                              (ENEMY_RECORD, enemies)):
+            for item in items:
+                body.append(record.pack(*item))
+                offset += record.size
+    
+    spawn_x, spawn_y = data["spawn"]
+    header = HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, size, width, height,
+                         spawn_x, spawn_y, *data["background"], len(moving), len(chunks))
+    # Written beside the output and renamed over it, so processes compiling
+    # the same level at once never see each other's half-written file
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(output_path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(b"".join(MOVING_RECORD.pack(*m) for m in moving))
+            f.write(b"".join(table))
+            f.write(b"".join(body))
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class Camera:
+    def __init__(self, width, height):
+        self.x, self.y = 0, 0
+        self.prev_x, self.prev_y = 0, 0
+        self.width, self.height = width, height
+    
+    def interpolate(self, alpha):
+        return (round(self.prev_x + (self.x - self.prev_x) * alpha),
+                round(self.prev_y + (self.y - self.prev_y) * alpha))
+    
+    def follow(self, target, level):
+        # Centre on the target, clamped to the level bounds
+        x = target.x + target.width // 2 - self.width // 2
+        y = target.y + target.height // 2 - self.height // 2
+        self.x = int(max(0, min(x, level.width - self.width)))
+        self.y = int(max(0, min(y, level.height - self.height)))
+    
+    def visible(self, x, y, width, height, margin=0):
+        return (x + width > self.x - margin and x < self.x + self.width + margin and
+                y + height > self.y - margin and y < self.y + self.height + margin)
+
+
+class LevelTemplate:
+    # Everything about a level that play never changes: header, chunk
+    # table, parsed chunk contents and baked chunk surfaces. Chunks are
+    # still read from the mmap on first use, then shared by every load of
+    # the level, so loading again only creates the mutable objects.
+    def __init__(self, name):
+        source = os.path.join(LEVEL_DIR, f"{name}.json")
+        compiled = os.path.join(LEVEL_DIR, f"{name}.lvl")
+        if (not os.path.exists(compiled) or
+                os.path.getmtime(compiled) < os.path.getmtime(source)):
+            compile_level(source, compiled)
+        
+        self.name = name
+        self.file = open(compiled, "rb")
+        self.data = data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.chunk_size, self.width, self.height, spawn_x, spawn_y,
+         r, g, b, moving_count, chunk_count) = HEADER.unpack_from(data, 0)
+        if magic != LEVEL_MAGIC or version != LEVEL_VERSION:
+            self.close()
+            raise ValueError(f"{name} is not a level file this version can read")
+        self.spawn = (spawn_x, spawn_y)
+        self.background_color = (r, g, b)
+        
+        offset = HEADER.size
+        self.moving = list(MOVING_RECORD.iter_unpack(
+            data[offset:offset + MOVING_RECORD.size * moving_count]))
+        offset += MOVING_RECORD.size * moving_count
+        
+        self.chunk_table = {}
+        self.enemy_total = 0
+        for cx, cy, chunk_offset, platforms, checkpoints, enemies in CHUNK_RECORD.iter_unpack(
+                data[offset:offset + CHUNK_RECORD.size * chunk_count]):
+            self.chunk_table[(cx, cy)] = (chunk_offset, platforms, checkpoints, enemies)
+            self.enemy_total += enemies
+        
+        self.contents = {}  # key -> (platforms, checkpoint points, enemy records)
+        self.surfaces = OrderedDict()
+    
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.file.close()
+            self.data = self.file = None
+    
+    def chunk(self, key):
+        contents = self.contents.get(key)
+        if contents is None:
+            offset, platform_count, checkpoint_count, enemy_count = self.chunk_table[key]
+            data = self.data
+            end = offset + PLATFORM_RECORD.size * platform_count
+            # Static platforms are never modified, so every load shares them
+            platforms = tuple(Platform(x, y, w, h, (r, g, b))
+                              for x, y, w, h, r, g, b in PLATFORM_RECORD.iter_unpack(data[offset:end]))
+            offset, end = end, end + CHECKPOINT_RECORD.size * checkpoint_count
+            checkpoints = tuple(CHECKPOINT_RECORD.iter_unpack(data[offset:end]))
+            offset, end = end, end + ENEMY_RECORD.size * enemy_count
+            enemies = tuple(ENEMY_RECORD.iter_unpack(data[offset:end]))
+            contents = self.contents[key] = (platforms, checkpoints, enemies)
+        return contents
+    
+    def surface(self, key, screen):
+        # Background, platforms and inactive checkpoints pre-rendered once
+        # per chunk. Levels copy a surface before drawing on it.
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        platforms, checkpoints, _ = self.chunk(key)
+        size = self.chunk_size
+        surface = pygame.Surface((size, size)).convert(screen)
+        surface.fill(self.background_color)
+        offset = (key[0] * size, key[1] * size)
+        for platform in platforms:
+            platform.draw(surface, offset)
+        for x, y in checkpoints:
+            Checkpoint(x, y).draw(surface, offset)
+        
+        self.surfaces[key] = surface
+        if len(self.surfaces) > TEMPLATE_SURFACES:
+            self.surfaces.popitem(last=False)
+        return surface
+
+_templates = OrderedDict()
+_preloads = {}  # name -> (worker thread, [template once built])
+
+def _preload(name, screen, view_size, result):
+    try:
+        template = LevelTemplate(name)
+        # Parse and bake what stream() loads first: the chunks around a
+        # camera centred on the spawn
+        width, height = view_size
+        size = template.chunk_size
+        spawn_x, spawn_y = template.spawn
+        x = max(0, min(spawn_x - width // 2, template.width - width))
+        y = max(0, min(spawn_y - height // 2, template.height - height))
+        for cx in range((x - size) // size, (x + width + size) // size + 1):
+            for cy in range((y - size) // size, (y + height + size) // size + 1):
+                if (cx, cy) in template.chunk_table:
+                    template.surface((cx, cy), screen)
+        result.append(template)
+    except Exception:
+        pass  # Loading it on the main thread will raise it properly
+
+def preload_template(name, screen, view_size):
+    # Builds a template on a worker thread. Nothing shared is touched
+    # until get_template() takes the result.
+    if name in _templates or name in _preloads:
+        return
+    result = []
+    thread = threading.Thread(target=_preload, args=(name, screen, view_size, result), daemon=True)
+    try:
+        thread.start()
+    except RuntimeError:
+        return  # No threads (the browser build): load on demand instead
+    _preloads[name] = (thread, result)
+
+def get_template(name):
+    template = _templates.get(name)
+    if template is not None:
+        _templates.move_to_end(name)
+        return template
+    preload = _preloads.pop(name, None)
+    if preload is not None:
+        # Usually long finished; if not, this is no slower than loading here
+        thread, result = preload
+        thread.join()
+        template = result[0] if result else None
+    if template is None:
+        template = LevelTemplate(name)
+    _templates[name] = template
+    if len(_templates) > TEMPLATE_CACHE_SIZE:
+        _templates.popitem(last=False)[1].close()
+    return template
+
+
+class Chunk:
+    def __init__(self, cx, cy, size):
+        self.cx, self.cy = cx, cy
+        self.x, self.y = cx * size, cy * size
+        self.platforms = []
+        self.checkpoints = []
+        self.enemies = []
+        self.surface = None
+        self.shared = True  # surface still belongs to the template
+
 
 class Level:
     def __init__(self, game):
         self.game = game
+        self.name = None
+        self.template = None
         self.platforms = []
         self.checkpoints = []
+        self.moving_platforms = []
         self.background_color = (30, 30, 50)
-        self.load("level_1")
-    
-    def load(self, level_name):
-        self.platforms = []
-        self.checkpoints = []
-        
-        # Base platform
-        self.platforms.append(Platform(0, 650, 1280, 70))
+        self.width, self.height = game.screen_width, game.screen_height
+        self.spawn = (100, 500)
         
-        # Level-specific platforms
-        if level_name == "level_1":
-            self._load_level_1()
-        elif level_name == "level_2":
-            self._load_level_2()
-        elif level_name == "boss_1":
-            self._load_boss_level()
-    
-    def _load_level_1(self):
-        # Simple platforms
-        self.platforms.append(Platform(200, 550, 200, 20))
-        self.platforms.append(Platform(500, 450, 200, 20))
-        self.platforms.append(Platform(800, 350, 200, 20))
+        # Streaming state for the current level
+        self.chunk_size = 640
+        self.chunk_table = {}
+        self.chunks = {}
+        self.killed = set()
+        self.enemy_total = 0
         
-        # Checkpoint
-        self.checkpoints.append(Checkpoint(900, 570))
-    
-    def _load_level_2(self):
-        # More complex layout
-        self.platforms.append(Platform(150, 600, 150, 20))
-        self.platforms.append(Platform(350, 500, 150, 20))
-        self.platforms.append(Platform(550, 400, 150, 20))
-        self.platforms.append(Platform(750, 500, 150, 20))
-        self.platforms.append(Platform(950, 600, 150, 20))
-        
-        # Moving platform
-        self.moving_platform = Platform(400, 300, 150, 20, (200, 100, 100))
-        self.platforms.append(self.moving_platform)
-        self.moving_direction = 1
+        # Re-baked regions in world space, pending copy to the screen
+        self.dirty_rects = []
+        self.preloading = False
+        self.spawning = True  # Clients mirroring a server leave enemies to it
+    
+    def level_name(self, level_num):
+        # Levels past the last shipped file cycle back through them
+        count = len([f for f in os.listdir(LEVEL_DIR) if f.endswith(".json")])
+        return f"level_{(level_num - 1) % count + 1}"
+    
+    def load(self, level_name):
+        template = self.template = get_template(level_name)
+        self.name = level_name
+        self.chunk_size = template.chunk_size
+        self.width, self.height = template.width, template.height
+        self.spawn = template.spawn
+        self.background_color = template.background_color
+        self.chunk_table = template.chunk_table
+        self.enemy_total = template.enemy_total
+        self.moving_platforms = [MovingPlatform(x, y, w, h, (r, g, b), min_x, max_x, speed)
+                                 for x, y, w, h, r, g, b, min_x, max_x, speed in template.moving]
         
-        # Checkpoints
-        self.checkpoints.append(Checkpoint(200, 580))
-        self.checkpoints.append(Checkpoint(1000, 580))
-    
-    def _load_boss_level(self):
-        # Arena-style level for boss fights
-        self.platforms.append(Platform(0, 700, 1280, 20))
-        self.platforms.append(Platform(100, 600, 200, 20))
-        self.platforms.append(Platform(980, 600, 200, 20))
+        self.chunks = {}
+        self.killed = set()
+        self.dirty_rects = []
+        self.preloading = False
+        self._rebuild_lists()
+    
+    def preload_next(self):
+        # Prepares the level after this one in the background, so the
+        # switch only has to instantiate it
+        camera = self.game.camera
+        preload_template(self.level_name(self.game.current_level + 1), self.game.screen,
+                         (camera.width, camera.height))
+        self.preloading = True
+    
+    def _load_chunk(self, key, spawn=True):
+        platforms, checkpoints, spawns = self.template.chunk(key)
+        chunk = Chunk(key[0], key[1], self.chunk_size)
+        chunk.platforms = platforms
+        chunk.checkpoints = [Checkpoint(x, y) for x, y in checkpoints]
+        if spawn:
+            for spawn_id, x, y, type_id in spawns:
+                if spawn_id not in self.killed:
+                    enemy = Enemy(self.game, x, y, TYPE_NAMES[type_id])
+                    enemy.spawn_id = spawn_id
+                    chunk.enemies.append(enemy)
+        chunk.surface = self.template.surface(key, self.game.screen)
+        self.chunks[key] = chunk
+    
+    def _unload_chunk(self, key):
+        chunk = self.chunks.pop(key)
+        # Enemies still alive respawn at their start when the chunk returns
+        store = self.game.enemy_store
+        for enemy in chunk.enemies:
+            if enemy.index is not None:
+                store.remove(enemy)
+    
+    def restore_chunks(self, keys, enemies, active):
+        # Brings the loaded chunks back to a snapshot's. Chunks still loaded
+        # keep their baked surface, and enemies come from the snapshot
+        # rather than the level file.
+        for key in list(self.chunks):
+            if key not in keys:
+                del self.chunks[key]
+        for key in keys:
+            if key not in self.chunks:
+                self._load_chunk(key, spawn=False)
+        for key, chunk in self.chunks.items():
+            chunk.enemies = enemies.get(key, [])
+            for checkpoint in chunk.checkpoints:
+                if checkpoint.active != ((checkpoint.x, checkpoint.y) in active):
+                    checkpoint.active = not checkpoint.active
+                    self._redraw_checkpoint(chunk, checkpoint)
+        self.dirty_rects = []
+        self._rebuild_lists()
+    
+    def remove_killed(self, killed):
+        # Marks spawns killed and takes any of them that are live out of the
+        # level, for when a snapshot from before they died is restored
+        self.killed |= killed
+        store = self.game.enemy_store
+        for enemy in [enemy for enemy in store.enemies
+                      if getattr(enemy, 'spawn_id', None) in self.killed]:
+            store.remove(enemy)
+        for chunk in self.chunks.values():
+            chunk.enemies = [enemy for enemy in chunk.enemies if enemy.index is not None]
+    
+    def _redraw_checkpoint(self, chunk, checkpoint):
+        # Copy on write: the first change to a chunk gets it its own surface
+        if chunk.shared:
+            chunk.surface = chunk.surface.copy()
+            chunk.shared = False
+        checkpoint.draw(chunk.surface, (chunk.x, chunk.y))
+    
+    def _rebuild_lists(self):
+        platforms = list(self.moving_platforms)
+        checkpoints = []
+        for chunk in self.chunks.values():
+            platforms.extend(chunk.platforms)
+            checkpoints.extend(chunk.checkpoints)
+        self.platforms = platforms
+        self.checkpoints = checkpoints
+    
+    def stream(self):
+        # Load chunks within one chunk of the camera and unload those more
+        # than two away, so crossing a boundary doesn't thrash
+        camera = self.game.camera
+        camera.follow(self.game.player, self)
+        size = self.chunk_size
+        x0, y0 = (camera.x - size) // size, (camera.y - size) // size
+        x1 = (camera.x + camera.width + size) // size
+        y1 = (camera.y + camera.height + size) // size
         
-        # Central platform
-        self.platforms.append(Platform(540, 500, 200, 20, (200, 50, 50)))
+        changed = False
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                if (cx, cy) not in self.chunks and (cx, cy) in self.chunk_table:
+                    self._load_chunk((cx, cy), self.spawning)
+                    changed = True
+        for cx, cy in list(self.chunks):
+            if cx < x0 - 1 or cx > x1 + 1 or cy < y0 - 1 or cy > y1 + 1:
+                self._unload_chunk((cx, cy))
+                changed = True
+        if changed:
+            self._rebuild_lists()
+    
+    def enemy_killed(self, enemy):
+        spawn_id = getattr(enemy, 'spawn_id', None)
+        if spawn_id is not None:
+            self.killed.add(spawn_id)
+    
+    @property
+    def enemies_remaining(self):
+        return self.enemy_total - len(self.killed)
     
     def update(self):
         # Update moving platforms
-        if hasattr(self, 'moving_platform'):
-            self.moving_platform.x += 2 * self.moving_direction
-            if self.moving_platform.x > 800 or self.moving_platform.x < 200:
-                self.moving_direction *= -1
+        for platform in self.moving_platforms:
+            platform.update()
+        
+        self.stream()
+        
+        if not self.preloading and self.enemies_remaining <= self.enemy_total * PRELOAD_REMAINING:
+            self.preload_next()
         
         # Check checkpoints
         for checkpoint in self.checkpoints:
             player = self.game.player
-            if (player.x + player.width > checkpoint.x and 
+            if (player.x + player.width > checkpoint.x and
                 player.x < checkpoint.x + checkpoint.width and
-                player.y + player.height > checkpoint.y and 
+                player.y + player.height > checkpoint.y and
                 player.y < checkpoint.y + checkpoint.height):
-                checkpoint.active = True
                 self.game.checkpoint_position = (checkpoint.x, checkpoint.y - 50)
+                if not checkpoint.active:
+                    # Re-bake the checkpoint in its active color
+                    checkpoint.active = True
+                    chunk = self.chunks[(checkpoint.x // self.chunk_size,
+                                         checkpoint.y // self.chunk_size)]
+                    self._redraw_checkpoint(chunk, checkpoint)
+                    self.dirty_rects.append(checkpoint.rect())
+                    self.game.save_checkpoint()
+    
+    def draw_static(self, screen):
+        camera = self.game.camera
+        if self.width < camera.width or self.height < camera.height:
+            screen.fill(self.background_color)
+        size = self.chunk_size
+        for chunk in self.chunks.values():
+            if camera.visible(chunk.x, chunk.y, size, size):
+                screen.blit(chunk.surface, (chunk.x - camera.x, chunk.y - camera.y))
     
     def draw(self, screen):
-        # Draw background
-        screen.fill(self.background_color)
-        
-        # Draw platforms
-        for platform in self.platforms:
-            platform.draw(screen)
+        self.draw_static(screen)
+        self.dirty_rects = []
+        self.draw_dynamic(screen)
+    
+    def erase(self, screen, rect):
+        # Restore a screen region from the baked chunks
+        screen.set_clip(rect)
+        self.draw_static(screen)
+        screen.set_clip(None)
+    
+    def draw_dynamic(self, screen):
+        # Copies any re-baked regions and draws moving platforms. Returns the
+        # screen regions touched.
+        camera = self.game.camera
+        offset = (camera.x, camera.y)
+        rects = [rect.move(-camera.x, -camera.y) for rect in self.dirty_rects]
+        for rect in rects:
+            self.erase(screen, rect)
+        self.dirty_rects = []
         
-        # Draw checkpoints
-        for checkpoint in self.checkpoints:
-            checkpoint.draw(screen)
\ No newline at end of file
+        alpha = self.game.alpha
+        for platform in self.moving_platforms:
+            shift = (platform.x - platform.prev_x) * (1 - alpha)
+            platform.draw(screen, (offset[0] + shift, offset[1]))
+            rects.append(platform.rect().move(-camera.x, -camera.y))
+        return rects
@@ -1,8 +1,91 @@
+import argparse
+import time
 from game.core import Game
+from game.profiler import AllocationTracer
+from game.replay import InputRecorder, ReplayInput, read_seed
+
+def trace_allocations(game):
+    game.profiler.tracer = AllocationTracer()
+    game.profiler.tracer.start()
+
+def report_allocations(game):
+    tracer = game.profiler.tracer
+    if tracer:
+        tracer.stop()
+        print("\n".join(tracer.report()))
 
 def main():
-    game = Game()
-    game.run()
+    parser = argparse.ArgumentParser(description="Advanced Platformer")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a display using the SDL dummy driver")
+    parser.add_argument("--frames", type=int, default=0,
+                        help="simulate this many frames uncapped and exit (implies --headless)")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only present the screen regions that changed each frame")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="profile every frame and write a Chrome trace-event JSON on exit")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record input and the RNG seed to a replay file on exit")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="replay a recorded session headless and uncapped, then exit")
+    parser.add_argument("--async-loop", action="store_true",
+                        help="drive frames from asyncio the way the browser build does")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="trace allocations per frame and print where they come from on exit")
+    parser.add_argument("--max-fps", type=int, default=0,
+                        help="cap on frames drawn per second; the simulation always ticks at 60")
+    args = parser.parse_args()
+    
+    if args.replay:
+        game = Game(headless=True, seed=read_seed(args.replay))
+        game.input = ReplayInput(game, args.replay)
+        game.profiler.enabled = bool(args.trace)
+        if args.trace_alloc:
+            trace_allocations(game)
+        start = time.perf_counter()
+        frames = game.simulate(len(game.input))
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {frames} frames in {elapsed:.2f}s ({frames / max(elapsed, 1e-9):.0f} frames/s)")
+        if args.trace:
+            game.profiler.export_chrome_trace(args.trace)
+        report_allocations(game)
+        return
+    
+    if args.frames:
+        game = Game(headless=True)
+        game.profiler.enabled = bool(args.trace)
+        if args.trace_alloc:
+            trace_allocations(game)
+        start = time.perf_counter()
+        frames = game.simulate(args.frames)
+        elapsed = time.perf_counter() - start
+        print(f"Simulated {frames} frames in {elapsed:.2f}s ({frames / max(elapsed, 1e-9):.0f} frames/s)")
+        if args.trace:
+            game.profiler.export_chrome_trace(args.trace)
+        report_allocations(game)
+        return
+    
+    game = Game(headless=args.headless, dirty_rects=args.dirty_rects)
+    if args.max_fps:
+        game.max_fps = args.max_fps
+    game.profiler.enabled = bool(args.trace)
+    if args.trace_alloc:
+        trace_allocations(game)
+    if args.record:
+        game.input = InputRecorder(game.seed)
+    try:
+        if args.async_loop:
+            # Only this mode pays for importing asyncio
+            import asyncio
+            asyncio.run(game.run_async())
+        else:
+            game.run()
+    finally:
+        if args.trace:
+            game.profiler.export_chrome_trace(args.trace)
+        if args.record:
+            game.input.save(args.record)
+        report_allocations(game)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,501 @@
+import argparse
+import socket
+import struct
+import sys
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+import pygame
+from game.core import Game
+from game.replay import KeyState, RECORDED_EVENTS, TRACKED_KEYS
+
+# Authoritative server mode. A headless server steps one Game per client
+# session; clients send only input and draw whatever state they're sent.
+# Snapshots are quantized to int32 rows and sent as the difference from
+# the newest snapshot the client has acknowledged, column by column and
+# zlib-compressed, so anything that stood still costs next to nothing.
+# Not part of the browser build, which has no UDP.
+
+NET_MAGIC = b"WPGN"
+NET_VERSION = 1
+DEFAULT_PORT = 47800
+TICK_RATE = 60
+QUANT = 4  # Positions and velocities travel in quarter pixels
+HISTORY = 64  # Snapshots kept on each side as delta bases, about a second
+SESSION_TIMEOUT = 5.0
+MAX_EVENTS = 32  # Unacknowledged input events resent with each packet
+MAX_DATAGRAM = 65507
+
+# Client to server: magic, version, packet sequence, newest snapshot
+# received, held TRACKED_KEYS as bits, event count; then per event its
+# sequence, type and key. Events are resent until a snapshot says the
+# server applied them, so a lost packet never loses a key press.
+INPUT = struct.Struct("<4sHIIBB")
+INPUT_EVENT = struct.Struct("<IHI")
+# Server to client: magic, version, tick, base tick (0 for none), last
+# input event applied; then the compressed body
+SNAPSHOT = struct.Struct("<4sHIII")
+
+# A snapshot is one int32 array per section, a row per entity
+SECTIONS = (
+    ("hud", ("frame", "level", "coins", "score", "deaths", "paused", "boss_phase")),
+    ("player", ("x", "y", "health", "max_health", "facing_right")),
+    ("platforms", ("x",)),
+    ("enemies", ("x", "y", "width", "height", "type", "health", "max_health", "boss")),
+    ("bullets", ("x", "y", "vel_x", "vel_y", "size", "color")),
+    ("enemy_bullets", ("x", "y", "vel_x", "vel_y", "size", "color")),
+)
+COUNTS = struct.Struct(f"<{len(SECTIONS)}I")
+
+def _quantize(values):
+    return np.rint(np.asarray(values, dtype=np.float64) * QUANT).astype(np.int32)
+
+def _pool_rows(pool):
+    n = pool.count
+    palette = np.array([r << 16 | g << 8 | b for r, g, b in pool.palette], dtype=np.int32)
+    colors = palette[pool.color[:n]] if n else np.zeros(0, dtype=np.int32)
+    return np.column_stack((_quantize(pool.x[:n]), _quantize(pool.y[:n]),
+                            _quantize(pool.vel_x[:n]), _quantize(pool.vel_y[:n]),
+                            pool.size[:n], colors)).astype(np.int32)
+
+def capture(game):
+    # What a client needs to draw the current tick
+    player = game.player
+    store = game.enemy_store
+    boss = getattr(game, 'boss', None)
+    n = store.count
+    
+    hud = np.array([[game.frame, game.current_level, game.coins, game.score, game.deaths,
+                     game.game_paused, boss.phase if boss else 0]], dtype=np.int32)
+    player_row = np.array([[*_quantize((player.x, player.y)), player.health,
+                            player.max_health, player.facing_right]], dtype=np.int32)
+    platforms = _quantize([p.x for p in game.level.moving_platforms]).reshape(-1, 1)
+    boss_flag = np.zeros(n, dtype=np.int32)
+    if boss is not None:
+        boss_flag[boss.index] = 1
+    enemies = np.column_stack((_quantize(store.x[:n]), _quantize(store.y[:n]),
+                               store.width[:n], store.height[:n], store.type_id[:n],
+                               np.ceil(store.health[:n]), store.max_health[:n],
+                               boss_flag)).astype(np.int32)
+    return (hud, player_row, platforms, enemies,
+            _pool_rows(game.projectiles), _pool_rows(game.enemy_projectiles))
+
+# Sections whose rows are x, y, vel_x, vel_y first and move in straight lines
+MOVING_SECTIONS = (4, 5)
+
+def _predict(base, ticks):
+    # The base moved on by `ticks`: bullets carried along their velocity,
+    # everything else where it was
+    predicted = list(base)
+    for i in MOVING_SECTIONS:
+        rows = predicted[i] = base[i].copy()
+        rows[:, :2] += rows[:, 2:4] * ticks
+    return predicted
+
+def encode(tick, state, base_tick=0, base=None, applied=0):
+    # Rows present in both snapshots are sent as differences from the
+    # predicted base, new rows as they are. Columns go out one after
+    # another so similar values sit together for zlib.
+    parts = [COUNTS.pack(*(len(rows) for rows in state))]
+    if base is not None:
+        base = _predict(base, tick - base_tick)
+    for i, rows in enumerate(state):
+        if base is not None:
+            m = min(len(rows), len(base[i]))
+            rows = rows.copy()
+            rows[:m] -= base[i][:m]
+        parts.append(rows.T.tobytes())
+    body = zlib.compress(b"".join(parts), 1)
+    return SNAPSHOT.pack(NET_MAGIC, NET_VERSION, tick, base_tick if base is not None else 0,
+                         applied) + body
+
+def decode(data, history):
+    # Returns (tick, last input event applied, state), or None when the
+    # base it was built on is no longer in history
+    magic, version, tick, base_tick, applied = SNAPSHOT.unpack_from(data, 0)
+    if magic != NET_MAGIC or version != NET_VERSION:
+        raise ValueError("not a snapshot this version can read")
+    base = None
+    if base_tick:
+        base = history.get(base_tick)
+        if base is None:
+            return None
+        base = _predict(base, tick - base_tick)
+    body = zlib.decompress(memoryview(data)[SNAPSHOT.size:])
+    counts = COUNTS.unpack_from(body, 0)
+    offset = COUNTS.size
+    state = []
+    for i, ((_, columns), n) in enumerate(zip(SECTIONS, counts)):
+        size = n * len(columns)
+        rows = np.frombuffer(body, np.int32, size, offset).reshape(len(columns), n).T.copy()
+        offset += size * 4
+        if base is not None:
+            m = min(n, len(base[i]))
+            rows[:m] += base[i][:m]
+        state.append(rows)
+    return tick, applied, tuple(state)
+
+def _apply_pool(pool, rows):
+    n = len(rows)
+    while pool.capacity < n:
+        pool._grow()
+    pool.count = n
+    pool.x[:n], pool.y[:n] = rows[:, 0] / QUANT, rows[:, 1] / QUANT
+    pool.vel_x[:n], pool.vel_y[:n] = rows[:, 2] / QUANT, rows[:, 3] / QUANT
+    pool.size[:n] = rows[:, 4]
+    pool.lifetime[:n] = 1
+    colors = rows[:, 5]
+    for packed in np.unique(colors).tolist():
+        index = pool.color_index((packed >> 16 & 255, packed >> 8 & 255, packed & 255))
+        pool.color[:n][colors == packed] = index
+
+def apply_state(game, state):
+    # Mirrors a snapshot into a client's Game, which is only ever drawn.
+    # What was there before becomes the previous tick for interpolation.
+    hud, player_row, platforms, enemies, bullets, enemy_bullets = state
+    frame, level_num, coins, score, deaths, paused, boss_phase = hud[0].tolist()
+    game.save_positions()
+    game.frame, game.coins, game.score, game.deaths = frame, coins, score, deaths
+    game.game_paused = bool(paused)
+    level = game.level
+    if level_num != game.current_level:
+        game.current_level = level_num
+        level.load(level.level_name(level_num))
+        game.full_redraw = True
+        game.teleported = True
+    
+    player = game.player
+    x, y, player.health, player.max_health, facing_right = player_row[0].tolist()
+    player.x, player.y = x / QUANT, y / QUANT
+    player.facing_right = bool(facing_right)
+    for platform, x in zip(level.moving_platforms, (platforms[:, 0] / QUANT).tolist()):
+        platform.x = x
+    
+    store = game.enemy_store
+    old, n = store.count, len(enemies)
+    while store.capacity < n:
+        store._grow()
+    store.count = n
+    store.x[:n], store.y[:n] = enemies[:, 0] / QUANT, enemies[:, 1] / QUANT
+    store.prev_x[old:n], store.prev_y[old:n] = store.x[old:n], store.y[old:n]
+    store.width[:n], store.height[:n] = enemies[:, 2], enemies[:, 3]
+    store.type_id[:n] = enemies[:, 4]
+    store.health[:n], store.max_health[:n] = enemies[:, 5], enemies[:, 6]
+    
+    # The boss row is drawn by a Boss handle, the same way snapshots restore one
+    store.custom.clear()
+    bosses = np.flatnonzero(enemies[:, 7]).tolist()
+    if bosses:
+        from game.boss import Boss
+        boss = getattr(game, 'boss', None)
+        if boss is None:
+            boss = game.boss = Boss.__new__(Boss)
+            boss.game, boss.store, boss.type = game, store, "tank"
+        boss.index, boss.phase = bosses[0], boss_phase
+        store.custom.append(boss)
+    elif hasattr(game, 'boss'):
+        del game.boss
+    
+    _apply_pool(game.projectiles, bullets)
+    _apply_pool(game.enemy_projectiles, enemy_bullets)
+    level.stream()
+
+
+class NetStats:
+    # Per tick (or client frame): seconds spent and bytes moved, over the
+    # last `capacity` of them
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.count = 0
+        self.seconds = np.zeros(capacity)
+        self.bytes = np.zeros(capacity, dtype=np.int64)
+        self.sessions = np.zeros(capacity, dtype=np.int64)
+        self.dropped = 0
+    
+    def record(self, seconds, sent, sessions=1):
+        i = self.count % self.capacity
+        self.seconds[i], self.bytes[i], self.sessions[i] = seconds, sent, sessions
+        self.count += 1
+    
+    def summary(self, unit="tick"):
+        rows = min(self.count, self.capacity)
+        if not rows:
+            return f"no {unit}s yet"
+        ms = self.seconds[:rows] * 1000
+        p50, p99 = np.percentile(ms, (50, 99)).tolist()
+        per_unit = self.bytes[:rows].mean()
+        line = f"{unit} p50 {p50:.2f} p99 {p99:.2f} ms  {per_unit:.0f} B/{unit}"
+        if unit == "tick":
+            sessions = int(self.sessions[(self.count - 1) % self.capacity])
+            per_session = self.bytes[:rows].sum() / max(self.sessions[:rows].sum(), 1)
+            line = (f"{sessions} sessions  {line} ({per_session:.0f} per session, "
+                    f"{per_unit * TICK_RATE * 8 / 1000:.1f} kbit/s)")
+        if self.dropped:
+            line += f"  {self.dropped} dropped"
+        return line
+
+
+class NetworkInput:
+    # Input source for a server session, fed from the client's packets
+    def __init__(self):
+        self.keys = KeyState()
+        self.events = []
+        self.pressed = ()
+        self.pending = []
+        self.applied = 0  # Sequence of the last event taken from the client
+    
+    def receive(self, mask, events):
+        self.pressed = [key for i, key in enumerate(TRACKED_KEYS) if mask >> i & 1]
+        for sequence, event_type, key in events:
+            if sequence > self.applied:
+                self.pending.append(pygame.event.Event(event_type, key=key))
+                self.applied = sequence
+    
+    def poll(self):
+        self.keys = KeyState(self.pressed)
+        self.events, self.pending = self.pending, []
+
+class Session:
+    def __init__(self, game):
+        self.game = game
+        game.particles.enabled = False  # Never drawn here
+        self.input = game.input = NetworkInput()
+        self.history = OrderedDict()  # tick -> state sent
+        self.tick = 0
+        self.ack = 0
+        self.sequence = 0
+        self.heard = time.perf_counter()
+
+class GameServer:
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, max_sessions=64):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.address = self.sock.getsockname()
+        self.max_sessions = max_sessions
+        self.sessions = {}  # client address -> Session
+        self.assets = None  # Sessions never draw, so they share one set
+        self.stats = NetStats()
+    
+    def _session(self, address):
+        session = self.sessions.get(address)
+        if session is None and len(self.sessions) < self.max_sessions:
+            game = Game(headless=True, assets=self.assets)
+            self.assets = game.assets
+            session = self.sessions[address] = Session(game)
+        return session
+    
+    def receive(self):
+        now = time.perf_counter()
+        while True:
+            try:
+                data, address = self.sock.recvfrom(MAX_DATAGRAM)
+            except BlockingIOError:
+                break
+            if len(data) < INPUT.size:
+                continue
+            magic, version, sequence, ack, mask, count = INPUT.unpack_from(data, 0)
+            if (magic != NET_MAGIC or version != NET_VERSION or
+                    len(data) < INPUT.size + count * INPUT_EVENT.size):
+                continue
+            session = self._session(address)
+            if session is None or sequence <= session.sequence:
+                continue
+            session.sequence, session.heard = sequence, now
+            session.ack = max(session.ack, ack)
+            session.input.receive(mask, [INPUT_EVENT.unpack_from(data, INPUT.size + i * INPUT_EVENT.size)
+                                         for i in range(count)])
+    
+    def tick(self):
+        # One simulation tick for every session, and a snapshot to each client
+        start = time.perf_counter()
+        self.receive()
+        sent = 0
+        for address, session in list(self.sessions.items()):
+            game = session.game
+            if start - session.heard > SESSION_TIMEOUT:
+                del self.sessions[address]
+                continue
+            game.step()
+            if not game.running:
+                del self.sessions[address]
+                continue
+            
+            session.tick += 1
+            state = capture(game)
+            base = session.history.get(session.ack)
+            packet = encode(session.tick, state, session.ack, base, session.input.applied)
+            try:
+                self.sock.sendto(packet, address)
+                sent += len(packet)
+            except OSError:
+                self.stats.dropped += 1
+            session.history[session.tick] = state
+            if len(session.history) > HISTORY:
+                session.history.popitem(last=False)
+        self.stats.record(time.perf_counter() - start, sent, len(self.sessions))
+    
+    def run(self, ticks=0, report_every=5.0):
+        tick_time = 1 / TICK_RATE
+        next_tick = time.perf_counter()
+        next_report = next_tick + report_every
+        count = 0
+        while not ticks or count < ticks:
+            self.tick()
+            count += 1
+            now = time.perf_counter()
+            if now >= next_report:
+                print(self.stats.summary(), flush=True)
+                next_report = now + report_every
+            next_tick += tick_time
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()
+
+class GameClient:
+    # Sends input every frame and draws what the server last sent. The
+    # local Game is a mirror: it's never stepped and never spawns enemies.
+    def __init__(self, game, address):
+        self.game = game
+        self.address = address
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.history = OrderedDict()  # tick -> state received
+        self.ack = 0
+        self.sequence = 0
+        self.event_sequence = 0
+        self.events = []  # (sequence, type, key) the server hasn't applied yet
+        self.received_at = time.perf_counter()
+        self.stats = NetStats()
+        
+        game.enemy_store.clear()
+        game.level.spawning = False
+        game.level.load(game.level.name)
+    
+    def send_input(self):
+        source = self.game.input
+        mask = sum(1 << i for i, key in enumerate(TRACKED_KEYS) if source.keys[key])
+        for event in source.events:
+            if event.type in RECORDED_EVENTS:
+                self.event_sequence += 1
+                self.events.append((self.event_sequence, event.type, getattr(event, 'key', 0)))
+        events = self.events[-MAX_EVENTS:]
+        self.sequence += 1
+        packet = INPUT.pack(NET_MAGIC, NET_VERSION, self.sequence, self.ack, mask, len(events))
+        self.sock.sendto(packet + b"".join(INPUT_EVENT.pack(*event) for event in events),
+                         self.address)
+    
+    def receive(self):
+        # Decodes everything waiting and mirrors only the newest state
+        newest = None
+        received = 0
+        while True:
+            try:
+                data = self.sock.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                break
+            except ConnectionRefusedError:
+                continue  # Server not up yet
+            received += len(data)
+            try:
+                decoded = decode(data, self.history)
+            except (ValueError, struct.error, zlib.error):
+                continue
+            if decoded is None or decoded[0] <= self.ack:
+                continue
+            tick, applied, state = decoded
+            self.history[tick] = state
+            if len(self.history) > HISTORY:
+                self.history.popitem(last=False)
+            self.ack = tick
+            self.events = [event for event in self.events if event[0] > applied]
+            newest = state
+        if newest is not None:
+            apply_state(self.game, newest)
+            self.received_at = time.perf_counter()
+        return received
+    
+    def frame(self):
+        start = time.perf_counter()
+        game = self.game
+        game.input.poll()
+        if any(event.type == pygame.QUIT for event in game.input.events):
+            game.running = False
+        self.send_input()
+        received = self.receive()
+        if not game.headless:
+            # Drawn up to a tick behind the newest snapshot, so there's
+            # always a previous one to interpolate from
+            game.render(min((time.perf_counter() - self.received_at) * game.fps, 1.0))
+        self.stats.record(time.perf_counter() - start, received)
+    
+    def run(self, seconds=0, report_every=5.0):
+        game = self.game
+        start = time.perf_counter()
+        next_report = start + report_every
+        while game.running and (not seconds or time.perf_counter() - start < seconds):
+            self.frame()
+            game.clock.tick(game.max_fps if not game.headless else TICK_RATE)
+            if time.perf_counter() >= next_report:
+                print(f"client: {self.stats.summary('frame')}", flush=True)
+                next_report = time.perf_counter() + report_every
+        print(f"client: {self.stats.summary('frame')}")
+
+
+def load_test(clients, ticks):
+    # A server and headless bot clients in one process, stepped in lockstep
+    # as fast as they go: the server's cost and bytes per tick for that
+    # many sessions
+    from game.sweep import BotInput
+    server = GameServer(port=0, max_sessions=clients)
+    bots = []
+    for i in range(clients):
+        client = GameClient(Game(headless=True, assets=server.assets), server.address)
+        server.assets = client.game.assets
+        client.game.input = BotInput(client.game, i)
+        bots.append(client)
+    for _ in range(ticks):
+        for client in bots:
+            client.frame()
+        server.tick()
+    for client in bots:
+        client.receive()
+    print(f"server: {server.stats.summary()}")
+    received = sum(int(client.stats.bytes.sum()) for client in bots)
+    print(f"clients: {received / max(ticks * clients, 1):.0f} B/tick each, "
+          f"newest tick {min(client.ack for client in bots)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Authoritative server and thin client")
+    parser.add_argument("mode", choices=("server", "client", "loadtest"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--ticks", type=int, default=0,
+                        help="server: stop after this many ticks; loadtest: ticks to run (default 600)")
+    parser.add_argument("--max-sessions", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=8, help="loadtest: bot clients to run")
+    parser.add_argument("--bot", action="store_true", help="client: let the sweep bot play")
+    parser.add_argument("--headless", action="store_true", help="client: don't open a window")
+    parser.add_argument("--seconds", type=float, default=0, help="client: disconnect after this long")
+    args = parser.parse_args()
+    
+    if args.mode == "server":
+        server = GameServer(args.host, args.port, args.max_sessions)
+        print(f"Serving on {server.address[0]}:{server.address[1]}", flush=True)
+        server.run(args.ticks)
+    elif args.mode == "client":
+        game = Game(headless=args.headless)
+        client = GameClient(game, (args.host, args.port))
+        if args.bot:
+            from game.sweep import BotInput
+            game.input = BotInput(game, game.seed)
+        client.run(args.seconds)
+    else:
+        load_test(args.clients, args.ticks or 600)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import numpy as np
+import pygame
+from game.render import LAYER_PARTICLES
+
+# Cosmetic particles: hit sparks, death bursts, boss phase changes. They
+# live in fixed arrays that never grow; once MAX_PARTICLES are alive new
+# ones are dropped. They draw from their own generator rather than
+# `random`, so effects never change what a seed and input log replay.
+MAX_PARTICLES = 2048
+GRAVITY = 0.25
+DRAG = 0.96
+
+# Frames slower than FRAME_BUDGET cut emission by BUDGET_BACKOFF, down to
+# MIN_SCALE of the asked-for count; frames well inside it win it back a
+# little at a time
+FRAME_BUDGET = 1 / 60
+BUDGET_BACKOFF = 0.7
+BUDGET_RECOVERY = 0.02
+MIN_SCALE = 0.1
+
+HIT_COLOR = (255, 220, 120)
+PLAYER_HIT_COLOR = (255, 60, 60)
+DEATH_COLOR = (255, 140, 40)
+PHASE_COLOR = (255, 80, 255)
+
+class ParticleSystem:
+    # Struct-of-arrays like ProjectilePool: slots [0, count) are live and
+    # dead particles are swap-removed
+    def __init__(self, capacity=MAX_PARTICLES, seed=0):
+        self.capacity = capacity
+        self.count = 0
+        self.enabled = True
+        self.scale = 1.0  # Share of requested particles actually emitted
+        self.rng = np.random.default_rng(seed)
+        
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vel_x = np.zeros(capacity, dtype=np.float32)
+        self.vel_y = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        self.lifetime = np.zeros(capacity, dtype=np.int32)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.int32)
+        
+        self.palette = []
+        self.palette_index = {}
+    
+    def _arrays(self):
+        return (self.x, self.y, self.vel_x, self.vel_y,
+                self.life, self.lifetime, self.size, self.color)
+    
+    def color_index(self, color):
+        index = self.palette_index.get(color)
+        if index is None:
+            index = len(self.palette)
+            self.palette.append(color)
+            self.palette_index[color] = index
+        return index
+    
+    def clear(self):
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def emit(self, x, y, count, color, speed=4.0, lifetime=30, size=3):
+        # count particles per origin, flung out in every direction; x and y
+        # are one origin or arrays of them
+        if not self.enabled:
+            return
+        x, y = np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32)
+        origins = x.size
+        total = int(origins * count * self.scale + self.rng.random())
+        total = min(total, self.capacity - self.count)
+        if total <= 0:
+            return
+        rng = self.rng
+        new = slice(self.count, self.count + total)
+        if origins > 1:
+            which = rng.integers(0, origins, total)
+            self.x[new], self.y[new] = x[which], y[which]
+        else:
+            self.x[new], self.y[new] = x, y
+        angles = rng.uniform(0, np.pi * 2, total)
+        speeds = rng.uniform(0.3, 1.0, total) * speed
+        self.vel_x[new] = np.cos(angles) * speeds
+        self.vel_y[new] = np.sin(angles) * speeds - speed * 0.3  # A little lift
+        lives = rng.integers(lifetime // 2, lifetime + 1, total)
+        self.life[new] = lives
+        self.lifetime[new] = lives
+        self.size[new] = size
+        self.color[new] = self.color_index(color)
+        self.count += total
+    
+    def update(self):
+        n = self.count
+        if not n:
+            return
+        vel_x, vel_y = self.vel_x[:n], self.vel_y[:n]
+        self.x[:n] += vel_x
+        self.y[:n] += vel_y
+        vel_x *= DRAG
+        vel_y *= DRAG
+        vel_y += GRAVITY
+        life = self.life[:n]
+        life -= 1
+        
+        alive = life > 0
+        live = int(np.count_nonzero(alive))
+        if live == n:
+            return
+        holes = np.flatnonzero(~alive[:live])
+        movers = np.flatnonzero(alive[live:n]) + live
+        for array in self._arrays():
+            array[holes] = array[movers]
+        self.count = live
+    
+    def budget(self, seconds):
+        # Called once per frame with the time the frame took
+        if seconds > FRAME_BUDGET:
+            self.scale = max(MIN_SCALE, self.scale * BUDGET_BACKOFF)
+        elif seconds < FRAME_BUDGET * 0.75:
+            self.scale = min(1.0, self.scale + BUDGET_RECOVERY)
+    
+    def _drawn_sizes(self):
+        # Particles shrink as they age
+        n = self.count
+        return np.maximum(self.size[:n] * self.life[:n] // self.lifetime[:n], 1)
+    
+    def draw(self, queue):
+        # One blit batch per drawn size and color; the vel-based lerp is
+        # the same approximation bullets use
+        n = self.count
+        if not n:
+            return
+        x = queue.lerp(self.x[:n] - self.vel_x[:n], self.x[:n])
+        y = queue.lerp(self.y[:n] - self.vel_y[:n], self.y[:n])
+        sizes = self._drawn_sizes()
+        keys = sizes * len(self.palette) + self.color[:n]
+        for key in np.unique(keys).tolist():
+            size, color = divmod(key, len(self.palette))
+            sprite = queue.assets.get("spark", (size * 2, size * 2), tint=self.palette[color])
+            same = keys == key
+            queue.submit_many(LAYER_PARTICLES, sprite, x[same] - size, y[same] - size)
+    
+    def rects(self, offset=(0, 0)):
+        n = self.count
+        return [pygame.Rect(x - size, y - size, size * 2, size * 2)
+                for x, y, size in zip((self.x[:n] - offset[0]).astype(np.int32).tolist(),
+                                      (self.y[:n] - offset[1]).astype(np.int32).tolist(),
+                                      self._drawn_sizes().tolist())]
@@ -0,0 +1,33 @@
+import numpy as np
+
+# Bullet patterns. Each builds a whole volley at once as (angles, speeds)
+# arrays, one entry per bullet; fire() turns a volley into velocities and
+# appends it to a projectile pool in a single call.
+
+def aimed(aim, count=3, speed=8, speed_step=1.5):
+    # A burst down one line, later bullets slightly faster so they spread out
+    return np.full(count, aim), speed + speed_step * np.arange(count)
+
+def spread(aim, count=5, arc=1.0, speed=6):
+    # A fan of bullets centered on the aim angle
+    return aim + np.linspace(-arc / 2, arc / 2, count), np.full(count, float(speed))
+
+def ring(count=12, speed=5, offset=0.0):
+    return offset + np.arange(count) * (np.pi * 2 / count), np.full(count, float(speed))
+
+def spiral(arms=4, per_arm=12, speed=3, speed_step=0.35, twist=0.12, offset=0.0):
+    # Each arm's bullets leave faster and further round, so the volley
+    # unwinds into a spiral as it flies
+    step = np.arange(per_arm)
+    angles = (offset + np.arange(arms)[:, None] * (np.pi * 2 / arms) + step * twist).ravel()
+    speeds = np.broadcast_to(speed + step * speed_step, (arms, per_arm)).ravel()
+    return angles, speeds
+
+def combine(*volleys):
+    return (np.concatenate([angles for angles, _ in volleys]),
+            np.concatenate([speeds for _, speeds in volleys]))
+
+def fire(pool, x, y, volley, damage, size, color, lifetime=180):
+    angles, speeds = volley
+    pool.spawn_many(x, y, np.cos(angles) * speeds, np.sin(angles) * speeds,
+                    damage, size, color, lifetime)
@@ -1,10 +1,12 @@
 import pygame
 from game.weapons import Weapon  
+from game.render import LAYER_PLAYER
 
 class Player:
     def __init__(self, game, x, y):
         self.game = game
         self.x, self.y = x, y
+        self.prev_x, self.prev_y = x, y
         self.width, self.height = 40, 60
         self.vel_x, self.vel_y = 0, 0
         self.jump_power = -15
@@ -13,6 +15,8 @@ class Player:
         self.on_ground = False
         self.health = 100
         self.max_health = 100
+        self.invulnerable = False  # Used by benchmarks and soak tests
+        self.damage_taken = 0
         self.double_jump = False
         self.double_jump_available = True
         self.facing_right = True
@@ -25,8 +29,8 @@ class Player:
         self.shoot_cooldown = 0
     
     def update(self):
-        # Movement
-        keys = pygame.key.get_pressed()
+        # Movement, from the state Game polled this frame
+        keys = self.game.input.keys
         
         # Left/Right movement
         self.vel_x = 0
@@ -36,7 +40,7 @@ class Player:
         if keys[pygame.K_d]:
             self.vel_x = self.speed
             self.facing_right = True
-            
+        
         # Jumping
         if keys[pygame.K_w] and self.on_ground:
             self.vel_y = self.jump_power
@@ -65,7 +69,7 @@ class Player:
                 self.on_ground = True
         
         # Check for falling off screen
-        if self.y > self.game.screen_height:
+        if self.y > self.game.level.height:
             self.health = 0
         
         # Update shoot cooldown
@@ -78,24 +82,20 @@ class Player:
             self.shoot_cooldown = self.current_weapon.cooldown
     
     def take_damage(self, amount):
-        self.health -= amount
-        if self.health <= 0:
-            self.game.game_over()
+        # Death is handled by Game.update once all entities have moved
+        if not self.invulnerable:
+            self.health -= amount
+            self.damage_taken += amount
     
-    def draw(self, screen):
-        # Draw player (rectangle for now)
-        color = (100, 200, 100)  # Green
-        pygame.draw.rect(screen, color, (self.x, self.y, self.width, self.height))
-        
-        # Draw weapon
-        weapon_x = self.x + self.width if self.facing_right else self.x - 20
-        pygame.draw.rect(screen, (150, 150, 150), (weapon_x, self.y + 20, 30, 10))
-        
-        # Draw health bar
-        health_ratio = self.health / self.max_health
-        pygame.draw.rect(screen, (255, 0, 0), (self.x, self.y - 20, self.width, 10))
-        pygame.draw.rect(screen, (0, 255, 0), (self.x, self.y - 20, self.width * health_ratio, 10))
+    def draw(self, queue):
+        # Body and weapon are one sprite, mirrored when facing left
+        x, y = queue.lerp(self.prev_x, self.x), queue.lerp(self.prev_y, self.y)
+        if self.facing_right:
+            queue.submit(LAYER_PLAYER, queue.assets.get("player"), x, y)
+        else:
+            queue.submit(LAYER_PLAYER, queue.assets.get("player", flip_x=True), x - 30, y)
+        queue.health_bar(x, y - 20, self.width, 10, self.health / self.max_health)
     
-    def reset_position(self):
-        self.x, self.y = 100, 500
-        self.vel_x, self.vel_y = 0, 0
\ No newline at end of file
+    def reset_position(self, x=100, y=500):
+        self.x, self.y = x, y
+        self.vel_x, self.vel_y = 0, 0
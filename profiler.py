@@ -0,0 +1,248 @@
+import gc
+import time
+from collections import Counter
+import numpy as np
+import pygame
+
+# Frame phases in the order Game runs them
+PHASES = ("events", "player", "enemies", "projectiles", "level_update",
+          "level_draw", "entities_draw", "ui_draw", "flip")
+PHASE_IDS = {name: i for i, name in enumerate(PHASES)}
+PHASE_COLORS = ((120, 120, 120), (100, 200, 100), (200, 50, 50), (255, 255, 0),
+                (0, 200, 200), (80, 80, 220), (200, 100, 200), (255, 150, 0), (255, 255, 255))
+
+class FrameProfiler:
+    # Times each phase of a frame into a fixed-size ring buffer. Every call
+    # returns immediately while disabled.
+    def __init__(self, capacity=600):
+        self.enabled = False
+        self.capacity = capacity
+        self.count = 0
+        self.index = 0
+        
+        # Per frame: absolute start, then each phase's offset and duration (ns)
+        self.frame_start = np.zeros(capacity, dtype=np.int64)
+        self.phase_start = np.zeros((capacity, len(PHASES)), dtype=np.int64)
+        self.phase_time = np.zeros((capacity, len(PHASES)), dtype=np.int64)
+        self.last_mark = 0
+        self.in_frame = False
+        self.tracer = None  # AllocationTracer, when allocations are traced
+        
+        # Overlay, with the graph kept on a surface that scrolls one column
+        # per frame
+        self.overlay = False
+        self.overlay_lines = []
+        self.overlay_timer = 0
+        self.graph = None
+    
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        if self.overlay:
+            self.enabled = True
+    
+    def begin_frame(self):
+        if self.tracer:
+            self.tracer.begin_frame()
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        i = self.index
+        self.frame_start[i] = now
+        self.phase_start[i] = 0
+        self.phase_time[i] = 0
+        self.last_mark = now
+        self.in_frame = True
+    
+    def mark(self, phase):
+        # Closes a phase: everything since the previous mark is charged to it
+        if not self.in_frame:
+            return
+        now = time.perf_counter_ns()
+        i, p = self.index, PHASE_IDS[phase]
+        if not self.phase_time[i, p]:
+            self.phase_start[i, p] = self.last_mark - self.frame_start[i]
+        self.phase_time[i, p] += now - self.last_mark
+        self.last_mark = now
+    
+    def end_frame(self):
+        if self.tracer:
+            self.tracer.end_frame()
+        if not self.in_frame:
+            return
+        self.in_frame = False
+        if self.overlay and self.graph is not None:
+            self._graph_column(self.index)
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+    
+    def frames(self):
+        # Ring buffer rows from oldest to newest
+        if self.count < self.capacity:
+            return np.arange(self.count)
+        return (np.arange(self.capacity) + self.index) % self.capacity
+    
+    def frame_times_ms(self):
+        return self.phase_time[self.frames()].sum(axis=1) / 1e6
+    
+    def percentiles(self, q=(50, 95, 99)):
+        times = self.frame_times_ms()
+        if not len(times):
+            return dict.fromkeys(q, 0.0)
+        return dict(zip(q, np.percentile(times, q).tolist()))
+    
+    def phase_means_ms(self):
+        rows = self.frames()
+        if not len(rows):
+            return dict.fromkeys(PHASES, 0.0)
+        return dict(zip(PHASES, (self.phase_time[rows].mean(axis=0) / 1e6).tolist()))
+    
+    def export_chrome_trace(self, path):
+        # Complete ("X") events in microseconds, one enclosing event per frame
+        import json
+        events = []
+        for frame, row in enumerate(self.frames().tolist()):
+            start = self.frame_start[row] / 1000
+            total = self.phase_time[row].sum() / 1000
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": start, "dur": total, "args": {"frame": frame}})
+            for p, name in enumerate(PHASES):
+                duration = self.phase_time[row, p]
+                if duration:
+                    events.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                                   "ts": start + self.phase_start[row, p] / 1000,
+                                   "dur": duration / 1000})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    
+    def _graph_column(self, row):
+        # Stacked bar for one frame, colored by phase; 16.7 ms is 80 px
+        graph = self.graph
+        width, height = graph.get_size()
+        graph.scroll(-2, 0)
+        graph.fill((20, 20, 30), (width - 2, 0, 2, height))
+        y = height
+        for p in range(len(PHASES)):
+            bar = self.phase_time[row, p] / 1e6 * (80 / 16.7)
+            if bar >= 0.5:
+                graph.fill(PHASE_COLORS[p], (width - 2, y - bar, 2, bar))
+                y -= bar
+        graph.fill((255, 60, 60), (width - 2, height - 80, 2, 1))
+    
+    def draw(self, screen, text):
+        if not self.overlay:
+            return
+        
+        width, height = 360, 200
+        x0, y0 = 20, screen.get_height() - height - 20
+        if self.graph is None:
+            self.graph = pygame.Surface((width, height - 50)).convert(screen)
+            self.graph.fill((20, 20, 30))
+        pygame.draw.rect(screen, (20, 20, 30), (x0, y0, width, 50))
+        screen.blit(self.graph, (x0, y0 + 50))
+        
+        # Text is refreshed twice a second so it stays readable and cheap
+        if self.overlay_timer <= 0:
+            pct = self.percentiles()
+            means = self.phase_means_ms()
+            slowest = sorted(means, key=means.get, reverse=True)[:2]
+            self.overlay_lines = [
+                f"p50 {pct[50]:.2f}  p95 {pct[95]:.2f}  p99 {pct[99]:.2f} ms",
+                "  ".join(f"{name} {means[name]:.2f}" for name in slowest),
+            ]
+            self.overlay_timer = 30
+        self.overlay_timer -= 1
+        for i, line in enumerate(self.overlay_lines):
+            screen.blit(text.render(20, line, (255, 255, 255)), (x0 + 6, y0 + 6 + i * 18))
+
+
+class AllocationTracer:
+    # Per-frame allocation tracing with tracemalloc, several times slower
+    # than a normal run. Each frame records the bytes it kept and its peak
+    # of short-lived ones. Every GC pass records its pause and charges the
+    # young objects that triggered it to the lines that allocated them:
+    # those are the allocations behind GC pauses.
+    def __init__(self, capacity=3600, depth=1):
+        self.capacity = capacity
+        self.depth = depth
+        self.count = 0
+        self.kept = np.zeros(capacity, dtype=np.int64)
+        self.peak = np.zeros(capacity, dtype=np.int64)
+        self.frame_start = 0
+        self.collections = []  # (frame, generation, pause ms)
+        self.gc_sites = Counter()  # "file:line" -> young objects at GC time
+        self.gc_started = 0
+        self.snapshot = None
+    
+    def start(self):
+        # tracemalloc pulls in pickle and friends, so only tracing imports it
+        import tracemalloc
+        self.tracemalloc = tracemalloc
+        tracemalloc.start(self.depth)
+        self.snapshot = self._take_snapshot()
+        gc.callbacks.append(self._on_gc)
+    
+    def stop(self):
+        if self.snapshot is None:
+            return
+        gc.callbacks.remove(self._on_gc)
+        self.retained = self._take_snapshot().compare_to(self.snapshot, "lineno")
+        self.tracemalloc.stop()
+        self.snapshot = None
+    
+    def _take_snapshot(self):
+        tracemalloc = self.tracemalloc
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)))
+    
+    def begin_frame(self):
+        if self.snapshot is None:
+            return
+        self.tracemalloc.reset_peak()
+        self.frame_start = self.tracemalloc.get_traced_memory()[0]
+    
+    def end_frame(self):
+        if self.snapshot is None:
+            return
+        current, peak = self.tracemalloc.get_traced_memory()
+        i = self.count % self.capacity
+        self.kept[i] = current - self.frame_start
+        self.peak[i] = peak - self.frame_start
+        self.count += 1
+    
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            get_traceback = self.tracemalloc.get_object_traceback
+            for obj in gc.get_objects(0):
+                traceback = get_traceback(obj)
+                if traceback is not None:
+                    frame = traceback[0]
+                    self.gc_sites[f"{frame.filename}:{frame.lineno}"] += 1
+            self.gc_started = time.perf_counter_ns()
+        else:
+            self.collections.append((self.count, info["generation"],
+                                     (time.perf_counter_ns() - self.gc_started) / 1e6))
+    
+    def report(self, top=10):
+        # Summary lines; call stop() first so retained memory is included
+        frames = min(self.count, self.capacity)
+        if not frames:
+            return ["No frames traced"]
+        kept, peak = self.kept[:frames], self.peak[:frames]
+        lines = [f"{self.count} frames: kept {kept.mean():.0f} B/frame, "
+                 f"short-lived peak {np.median(peak) / 1024:.1f} KiB median, "
+                 f"{peak.max() / 1024:.1f} KiB max"]
+        pauses = [pause for _, _, pause in self.collections]
+        lines.append(f"{len(pauses)} GC passes ({len(pauses) * 1000 / self.count:.1f} per 1k frames)"
+                     + (f", worst {max(pauses):.2f} ms" if pauses else ""))
+        if self.gc_sites:
+            lines.append("Young objects at GC time, by allocating line:")
+            lines.extend(f"  {count:>7}  {site}" for site, count in self.gc_sites.most_common(top))
+        retained = getattr(self, "retained", None)
+        if retained:
+            lines.append("Memory kept over the run, by allocating line:")
+            for stat in retained[:top]:
+                frame = stat.traceback[0]
+                lines.append(f"  {stat.size_diff / self.count:>7.1f} B/frame  "
+                             f"{stat.count_diff:>+6} blocks  {frame.filename}:{frame.lineno}")
+        return lines
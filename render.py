@@ -0,0 +1,124 @@
+from itertools import repeat
+import numpy as np
+
+# Draw order, back to front
+LAYER_BULLETS = 0
+LAYER_PLAYER = 1
+LAYER_ENEMIES = 2
+LAYER_BOSS = 3
+LAYER_PARTICLES = 4
+LAYER_BARS = 5
+LAYER_LABELS = 6
+
+BAR_BACK = (255, 0, 0)
+BAR_FILL = (0, 255, 0)
+
+class RenderQueue:
+    # Entities submit sprites in world space instead of drawing. Commands
+    # outside the view are dropped on submit, and flush() draws layer by
+    # layer with one blits() call per sprite, so a frame costs a handful
+    # of pygame calls however many entities there are. The command lists
+    # are emptied and refilled each frame rather than rebuilt, so a steady
+    # frame leaves nothing new behind for the GC.
+    def __init__(self, assets):
+        self.assets = assets
+        self.layers = [{} for _ in range(LAYER_LABELS + 1)]  # {surface: ([x], [y])}
+        # Bars as columns: x, y, width, height, filled width
+        self.bars = ([], [], [], [], [])
+        self.view = (0, 0, 0, 0)
+        self.alpha = 1.0
+    
+    def begin(self, camera, alpha=1.0):
+        # alpha is how far the frame is from the previous tick to the last
+        for sprites in self.layers:
+            if sprites:
+                # Sprites nobody drew last frame are let go, so evicted
+                # asset variants aren't kept alive here
+                for surface in [surface for surface, (xs, _) in sprites.items() if not xs]:
+                    del sprites[surface]
+                for xs, ys in sprites.values():
+                    xs.clear()
+                    ys.clear()
+        for column in self.bars:
+            column.clear()
+        self.view = (camera.x, camera.y, camera.x + camera.width, camera.y + camera.height)
+        self.alpha = alpha
+    
+    def lerp(self, previous, current):
+        # Scalars or arrays
+        return previous + (current - previous) * self.alpha
+    
+    def _positions(self, layer, surface):
+        sprites = self.layers[layer]
+        positions = sprites.get(surface)
+        if positions is None:
+            positions = sprites[surface] = ([], [])
+        return positions
+    
+    def submit(self, layer, surface, x, y):
+        left, top, right, bottom = self.view
+        width, height = surface.get_size()
+        if x + width <= left or x >= right or y + height <= top or y >= bottom:
+            return
+        xs, ys = self._positions(layer, surface)
+        xs.append(int(x - left))
+        ys.append(int(y - top))
+    
+    def submit_many(self, layer, surface, x, y):
+        # x and y are arrays of world positions, all drawn with one sprite
+        left, top, right, bottom = self.view
+        width, height = surface.get_size()
+        visible = (x + width > left) & (x < right) & (y + height > top) & (y < bottom)
+        if not visible.any():
+            return
+        xs, ys = self._positions(layer, surface)
+        xs.extend((x[visible] - left).astype(np.int32).tolist())
+        ys.extend((y[visible] - top).astype(np.int32).tolist())
+    
+    def health_bar(self, x, y, width, height, ratio):
+        left, top, right, bottom = self.view
+        if width < 1 or x + width <= left or x >= right or y + height <= top or y >= bottom:
+            return
+        bar_x, bar_y, bar_width, bar_height, bar_filled = self.bars
+        bar_x.append(int(x - left))
+        bar_y.append(int(y - top))
+        bar_width.append(int(width))
+        bar_height.append(int(height))
+        bar_filled.append(int(width * max(ratio, 0)))
+    
+    def health_bars(self, x, y, width, height, ratio):
+        left, top, right, bottom = self.view
+        visible = (x + width > left) & (x < right) & (y + height > top) & (y < bottom)
+        count = int(visible.sum())
+        if not count:
+            return
+        width = width[visible]
+        bar_x, bar_y, bar_width, bar_height, bar_filled = self.bars
+        bar_x.extend((x[visible] - left).astype(np.int32).tolist())
+        bar_y.extend((y[visible] - top).astype(np.int32).tolist())
+        bar_width.extend(width.astype(np.int32).tolist())
+        bar_height.extend(repeat(int(height), count))
+        bar_filled.extend((width * np.maximum(ratio[visible], 0)).astype(np.int32).tolist())
+    
+    def flush(self, screen):
+        # Sequences are generators so no per-frame command lists build up
+        for layer, sprites in enumerate(self.layers):
+            if layer == LAYER_BARS and self.bars[0]:
+                screen.blits(self._bar_commands(), doreturn=False)
+            for surface, (xs, ys) in sprites.items():
+                if xs:
+                    screen.blits(zip(repeat(surface), zip(xs, ys)), doreturn=False)
+    
+    def _bar_commands(self):
+        # Every bar is a red sprite under a green one clipped to the health
+        # left, so all of them go out in a single blits() call
+        assets = self.assets
+        back = fill = None
+        size = None
+        for x, y, width, height, filled in zip(*self.bars):
+            if (width, height) != size:
+                size = (width, height)
+                back = assets.get("bar", size, tint=BAR_BACK)
+                fill = assets.get("bar", size, tint=BAR_FILL)
+            yield back, (x, y)
+            yield fill, (x, y), (0, 0, filled, height)
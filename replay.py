@@ -0,0 +1,103 @@
+import struct
+import zlib
+import pygame
+
+# Input sources. Game polls one of these once per frame; Player and
+# handle_events only ever read the polled state, so a recorded session can
+# be fed back through exactly the same code.
+
+REPLAY_MAGIC = b"WPGR"
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct("<4sHQI")  # magic, version, seed, frame count
+RECORDED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP)
+
+# Held keys the game polls; add to this when Player reads a new key
+TRACKED_KEYS = (pygame.K_a, pygame.K_d, pygame.K_w)
+
+class KeyState:
+    # Stand-in for pygame.key.get_pressed() built from a set of key codes
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+    
+    def __getitem__(self, key):
+        return key in self.pressed
+
+class LiveInput:
+    def __init__(self):
+        self.keys = KeyState()
+        self.events = []
+    
+    def poll(self):
+        self.events = pygame.event.get()
+        self.keys = pygame.key.get_pressed()
+
+class InputRecorder(LiveInput):
+    # Polls live input and keeps a compact per-frame log of it
+    def __init__(self, seed):
+        super().__init__()
+        self.seed = seed
+        self.frames = []
+    
+    def poll(self):
+        super().poll()
+        keys = self.keys
+        pressed = tuple(k for k in TRACKED_KEYS if keys[k])
+        events = tuple((event.type, getattr(event, 'key', 0)) for event in self.events
+                       if event.type in RECORDED_EVENTS)
+        self.frames.append((pressed, events))
+    
+    def save(self, path):
+        body = []
+        for pressed, events in self.frames:
+            body.append(struct.pack(f"<B{len(pressed)}I", len(pressed), *pressed))
+            body.append(struct.pack("<H", len(events)))
+            for event_type, key in events:
+                body.append(struct.pack("<HI", event_type, key))
+        with open(path, "wb") as f:
+            f.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, len(self.frames)))
+            f.write(zlib.compress(b"".join(body)))
+
+class ReplayInput:
+    # Feeds a recorded log back one frame per poll, then quits the game
+    def __init__(self, game, path):
+        self.game = game
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, self.seed, count = REPLAY_HEADER.unpack_from(data, 0)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a replay this version can read")
+        
+        body = zlib.decompress(data[REPLAY_HEADER.size:])
+        self.frames = []
+        offset = 0
+        for _ in range(count):
+            (key_count,) = struct.unpack_from("<B", body, offset)
+            pressed = struct.unpack_from(f"<{key_count}I", body, offset + 1)
+            offset += 1 + 4 * key_count
+            (event_count,) = struct.unpack_from("<H", body, offset)
+            offset += 2
+            events = []
+            for _ in range(event_count):
+                event_type, key = struct.unpack_from("<HI", body, offset)
+                offset += 6
+                events.append(pygame.event.Event(event_type, key=key))
+            self.frames.append((KeyState(pressed), events))
+        
+        self.position = 0
+        self.keys = KeyState()
+        self.events = []
+    
+    def __len__(self):
+        return len(self.frames)
+    
+    def poll(self):
+        if self.position >= len(self.frames):
+            self.keys, self.events = KeyState(), []
+            self.game.running = False
+            return
+        self.keys, self.events = self.frames[self.position]
+        self.position += 1
+
+def read_seed(path):
+    with open(path, "rb") as f:
+        return REPLAY_HEADER.unpack(f.read(REPLAY_HEADER.size))[2]
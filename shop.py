@@ -0,0 +1,69 @@
+import pygame
+from game.weapons import Weapon
+
+# Only imported the first time the shop is opened
+
+class WeaponShop:
+    def __init__(self, game):
+        self.game = game
+        self.weapons = [
+            Weapon("Pistol", 10, 10, 20),
+            Weapon("Shotgun", 15, 8, 30, 15, (255, 150, 0)),
+            Weapon("Rifle", 8, 15, 10, 5, (0, 255, 255)),
+            Weapon("Rocket Launcher", 30, 5, 60, 20, (255, 0, 0))
+        ]
+        self.active = False
+    
+    def toggle_shop(self):
+        self.active = not self.active
+    
+    def buy_weapon(self, weapon_index):
+        weapon = self.weapons[weapon_index]
+        if self.game.coins >= weapon.price:
+            self.game.coins -= weapon.price
+            self.game.player.weapons.append(weapon)
+            self.game.player.current_weapon = weapon
+            return True
+        return False
+    
+    def upgrade_weapon(self, weapon_index):
+        if weapon_index < len(self.game.player.weapons):
+            weapon = self.game.player.weapons[weapon_index]
+            if self.game.coins >= weapon.price:
+                self.game.coins -= weapon.price
+                weapon.upgrade()
+                return True
+        return False
+    
+    def draw(self, screen):
+        if not self.active:
+            return
+            
+        # Draw shop background
+        pygame.draw.rect(screen, (50, 50, 80), (300, 200, 680, 320))
+        
+        text = self.game.ui.text
+        
+        # Draw title
+        screen.blit(text.render(48, "WEAPON SHOP", (255, 255, 255)), (500, 220))
+        
+        # Draw coins
+        screen.blit(text.render(48, f"Coins: {self.game.coins}", (255, 215, 0)), (320, 220))
+        
+        # Draw weapons for sale
+        for i, weapon in enumerate(self.weapons):
+            y_pos = 270 + i * 60
+            color = (0, 255, 0) if self.game.coins >= weapon.price else (255, 0, 0)
+            
+            weapon_text = text.render(
+                36, f"{weapon.name} - Damage: {weapon.damage} - Cooldown: {weapon.cooldown} - Price: {weapon.price}",
+                color)
+            screen.blit(weapon_text, (320, y_pos))
+            
+            # Draw buy button
+            pygame.draw.rect(screen, (100, 100, 150), (900, y_pos, 60, 30))
+            screen.blit(text.render(36, "Buy", (255, 255, 255)), (910, y_pos))
+        
+        # Draw close button
+        pygame.draw.rect(screen, (200, 50, 50), (500, 500, 120, 40))
+        screen.blit(text.render(36, "CLOSE", (255, 255, 255)), (530, 510))
@@ -0,0 +1,205 @@
+import random
+import struct
+import numpy as np
+from game.enemies import Enemy, TYPE_NAMES
+from game.weapons import Weapon
+
+# Whole-simulation snapshots in one compact buffer. Fixed-size state is
+# packed with struct; entity arrays are written as raw bytes and restored
+# with one copy per array. Level geometry isn't stored at all: it comes
+# back from the level file, and only the chunks that were loaded, killed
+# spawns, checkpoint flags and moving platforms are recorded.
+
+STATE_MAGIC = b"WPGS"
+STATE_VERSION = 3
+
+# magic, version, level, frame, coins, score, deaths, next AI phase,
+# has checkpoint, checkpoint x, checkpoint y
+HEADER = struct.Struct("<4sHiqiiii?ii")
+RNG_STATE = struct.Struct("<i625I?d")  # random.getstate()
+# x, y, vel_x, vel_y, health, max_health, damage_taken, on_ground,
+# facing_right, double_jump, double_jump_available, shoot_cooldown,
+# current weapon, weapon count
+PLAYER = struct.Struct("<7d4?dii")
+# damage, speed, cooldown, bullet size, color, upgrade level, price; after
+# the name. Stats are doubles since custom weapons needn't be integral.
+WEAPON = struct.Struct("<dddiBBBii")
+POOL = struct.Struct("<ii")  # count, palette size
+COLOR = struct.Struct("<BBB")
+ENEMY = struct.Struct("<?iiiB")  # boss, spawn id, chunk x, chunk y, has chunk
+BOSS = struct.Struct("<iii")  # phase, attack pattern, pattern timer
+LEVEL = struct.Struct("<iiii")  # moving platforms, killed, chunks, active checkpoints
+MOVING = struct.Struct("<di")
+POINT = struct.Struct("<ii")
+COUNT = struct.Struct("<i")
+
+def _number(value):
+    # Stats stored as doubles come back as ints when they were ints
+    return int(value) if value.is_integer() else value
+
+def _pack_str(text):
+    data = text.encode()
+    return COUNT.pack(len(data)) + data
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+    
+    def unpack(self, record):
+        values = record.unpack_from(self.data, self.offset)
+        self.offset += record.size
+        return values
+    
+    def string(self):
+        (length,) = self.unpack(COUNT)
+        text = bytes(self.data[self.offset:self.offset + length]).decode()
+        self.offset += length
+        return text
+    
+    def array(self, dtype, count):
+        array = np.frombuffer(self.data, dtype, count, self.offset)
+        self.offset += array.nbytes
+        return array
+
+def save_state(game):
+    player = game.player
+    store = game.enemy_store
+    level = game.level
+    n = store.count
+    checkpoint = game.checkpoint_position
+    parts = [HEADER.pack(STATE_MAGIC, STATE_VERSION, game.current_level, game.frame,
+                         game.coins, game.score, game.deaths, store.next_phase,
+                         checkpoint is not None, *(checkpoint or (0, 0)))]
+    
+    version, internal, gauss = random.getstate()
+    parts.append(RNG_STATE.pack(version, *internal, gauss is not None, gauss or 0.0))
+    
+    weapons = player.weapons
+    parts.append(PLAYER.pack(player.x, player.y, player.vel_x, player.vel_y, player.health,
+                             player.max_health, player.damage_taken, player.on_ground,
+                             player.facing_right, player.double_jump,
+                             player.double_jump_available, player.shoot_cooldown,
+                             weapons.index(player.current_weapon), len(weapons)))
+    for weapon in weapons:
+        parts.append(_pack_str(weapon.name))
+        parts.append(WEAPON.pack(weapon.damage, weapon.speed, weapon.cooldown, weapon.bullet_size,
+                                 *weapon.bullet_color, weapon.upgrade_level, weapon.price))
+    
+    # Enemies: the store's arrays, then what each handle adds to its slot
+    chunk_of = {}
+    for key, chunk in level.chunks.items():
+        for enemy in chunk.enemies:
+            chunk_of[id(enemy)] = key
+    parts.append(COUNT.pack(n))
+    for name, dtype in store.FIELDS.items():
+        parts.append(getattr(store, name)[:n].tobytes())
+    for enemy in store.enemies:
+        key = chunk_of.get(id(enemy))
+        boss = enemy is getattr(game, 'boss', None)
+        parts.append(ENEMY.pack(boss, getattr(enemy, 'spawn_id', -1), *(key or (0, 0)),
+                                key is not None))
+        if boss:
+            parts.append(_pack_str(enemy.boss_type))
+            parts.append(BOSS.pack(enemy.phase, enemy.attack_pattern, enemy.pattern_timer))
+    
+    for pool in (game.projectiles, game.enemy_projectiles):
+        parts.append(POOL.pack(pool.count, len(pool.palette)))
+        parts.extend(COLOR.pack(*color) for color in pool.palette)
+        parts.extend(array[:pool.count].tobytes() for array in pool._arrays())
+    
+    active = [(c.x, c.y) for c in level.checkpoints if c.active]
+    parts.append(_pack_str(level.name))
+    parts.append(LEVEL.pack(len(level.moving_platforms), len(level.killed), len(level.chunks),
+                            len(active)))
+    parts.extend(MOVING.pack(p.x, p.direction) for p in level.moving_platforms)
+    parts.append(np.array(sorted(level.killed), dtype=np.int32).tobytes())
+    parts.extend(POINT.pack(*key) for key in level.chunks)
+    parts.extend(POINT.pack(*point) for point in active)
+    return b"".join(parts)
+
+def load_state(game, data):
+    reader = _Reader(data)
+    (magic, version, game.current_level, game.frame, game.coins, game.score, game.deaths,
+     next_phase, has_checkpoint, cx, cy) = reader.unpack(HEADER)
+    if magic != STATE_MAGIC or version != STATE_VERSION:
+        raise ValueError("not a snapshot this version can read")
+    game.checkpoint_position = (cx, cy) if has_checkpoint else None
+    
+    rng = reader.unpack(RNG_STATE)
+    random.setstate((rng[0], rng[1:626], rng[627] if rng[626] else None))
+    
+    player = game.player
+    (player.x, player.y, player.vel_x, player.vel_y, player.health, player.max_health,
+     player.damage_taken, player.on_ground, player.facing_right, player.double_jump,
+     player.double_jump_available, player.shoot_cooldown, current,
+     weapon_count) = reader.unpack(PLAYER)
+    weapons = []
+    for _ in range(weapon_count):
+        name = reader.string()
+        damage, speed, cooldown, size, r, g, b, upgrade_level, price = reader.unpack(WEAPON)
+        weapon = Weapon(name, _number(damage), _number(speed), _number(cooldown), size, (r, g, b))
+        weapon.upgrade_level, weapon.price = upgrade_level, price
+        weapons.append(weapon)
+    player.shoot_cooldown = _number(player.shoot_cooldown)
+    player.weapons = weapons
+    player.current_weapon = weapons[current]
+    
+    # Enemies: arrays straight back into the store, then fresh handles
+    store = game.enemy_store
+    store.clear()
+    (n,) = reader.unpack(COUNT)
+    while store.capacity < n:
+        store._grow()
+    for name, dtype in store.FIELDS.items():
+        getattr(store, name)[:n] = reader.array(dtype, n)
+    store.count = n
+    store.next_phase = next_phase
+    if hasattr(game, 'boss'):
+        del game.boss
+    
+    from game.boss import Boss
+    chunk_enemies = {}
+    for i in range(n):
+        boss, spawn_id, kx, ky, has_chunk = reader.unpack(ENEMY)
+        cls = Boss if boss else Enemy
+        enemy = cls.__new__(cls)
+        enemy.game, enemy.store, enemy.index = game, store, i
+        enemy.type = TYPE_NAMES[store.type_id[i]]
+        if spawn_id >= 0:
+            enemy.spawn_id = spawn_id
+        if boss:
+            enemy.boss_type = reader.string()
+            enemy.phase, enemy.attack_pattern, enemy.pattern_timer = reader.unpack(BOSS)
+            enemy.projectiles = game.enemy_projectiles
+            game.boss = enemy
+            store.custom.append(enemy)
+        if has_chunk:
+            chunk_enemies.setdefault((kx, ky), []).append(enemy)
+        store.enemies.append(enemy)
+    
+    for pool in (game.projectiles, game.enemy_projectiles):
+        count, palette_size = reader.unpack(POOL)
+        pool.palette = [reader.unpack(COLOR) for _ in range(palette_size)]
+        pool.palette_index = {color: i for i, color in enumerate(pool.palette)}
+        pool.clear()
+        while pool.capacity < count:
+            pool._grow()
+        for array in pool._arrays():
+            array[:count] = reader.array(array.dtype, count)
+        pool.count = count
+        pool.build_grid()
+    
+    level = game.level
+    name = reader.string()
+    moving, killed, chunk_count, active_count = reader.unpack(LEVEL)
+    if name != level.name:
+        level.load(name)
+    for platform in level.moving_platforms[:moving]:
+        platform.x, platform.direction = reader.unpack(MOVING)
+    level.killed = set(reader.array(np.int32, killed).tolist())
+    chunks = [reader.unpack(POINT) for _ in range(chunk_count)]
+    active = {reader.unpack(POINT) for _ in range(active_count)}
+    level.restore_chunks(chunks, chunk_enemies, active)
+    game.camera.follow(player, level)
+    game.full_redraw = True
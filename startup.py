@@ -0,0 +1,94 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from game.bundle import PACKAGE_DIR, RUNTIME_MODULES
+
+# Time to first frame, measured in fresh interpreters the way a player
+# hits it: either from plain sources with no bytecode cache, or from the
+# unpacked web bundle.
+
+CHILD = """
+import time
+start = time.perf_counter()
+from game.core import Game
+imported = time.perf_counter()
+game = Game(seed=1)
+built = time.perf_counter()
+game.tick()
+first_frame = time.perf_counter()
+print(imported - start, built - imported, first_frame - built)
+"""
+
+PHASES = ("import", "init", "first_frame", "total")
+
+def install_sources(root):
+    package = os.path.join(root, "game")
+    shutil.copytree(os.path.join(PACKAGE_DIR, "level_data"), os.path.join(package, "level_data"),
+                    ignore=shutil.ignore_patterns("*.lvl"))
+    for module in RUNTIME_MODULES:
+        shutil.copy(os.path.join(PACKAGE_DIR, f"{module}.py"), package)
+
+def install_bundle(root, bundle):
+    with zipfile.ZipFile(bundle) as archive:
+        archive.extractall(root)
+
+def run_child(bundle=None, options=()):
+    # A fresh copy per run, so no bytecode or level cache survives between runs
+    with tempfile.TemporaryDirectory() as root:
+        if bundle:
+            install_bundle(root, bundle)
+        else:
+            install_sources(root)
+        env = dict(os.environ, SDL_VIDEODRIVER="dummy", PYTHONPATH=root,
+                   PYGAME_HIDE_SUPPORT_PROMPT="1")
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, *options, "-c", CHILD], env=env, cwd=root,
+                                capture_output=True, text=True, check=True)
+        total = time.perf_counter() - start
+    return result, total
+
+def measure(bundle=None):
+    result, total = run_child(bundle)
+    return [float(value) for value in result.stdout.split()] + [total]
+
+def slowest_imports(bundle=None, count=15):
+    # One more run under -X importtime: (self ms, cumulative ms, module),
+    # slowest first by the module's own time
+    result, _ = run_child(bundle, ("-X", "importtime"))
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line[len("import time:"):].split("|")
+        imports.append((int(own) / 1000, int(cumulative) / 1000, module.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time to first frame")
+    parser.add_argument("--bundle", metavar="PATH", help="start from this web bundle instead of sources")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--imports", type=int, default=0, metavar="N",
+                        help="also list the N slowest module imports")
+    args = parser.parse_args()
+    
+    samples = [measure(args.bundle) for _ in range(args.runs)]
+    print(f"{'phase':<14}{'median':>10}{'min':>10}{'max':>10}  (ms, {args.runs} runs, "
+          f"{'bundle' if args.bundle else 'sources'})")
+    for i, phase in enumerate(PHASES):
+        values = [sample[i] * 1000 for sample in samples]
+        print(f"{phase:<14}{statistics.median(values):>10.1f}{min(values):>10.1f}{max(values):>10.1f}")
+    
+    if args.imports:
+        print(f"\n{'self':>8}{'cumul.':>10}  module (ms, one run)")
+        for own, cumulative, module in slowest_imports(args.bundle, args.imports):
+            print(f"{own:>8.1f}{cumulative:>10.1f}  {module}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
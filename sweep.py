@@ -0,0 +1,239 @@
+import argparse
+import copy
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pygame
+from game.core import Game
+from game.enemies import ENEMY_TYPES, Enemy
+from game.replay import KeyState, ReplayInput, read_seed
+from game.weapons import Weapon
+
+# Balancing sweeps: many headless games across a process pool, one per
+# parameter set, with results streamed back as each run finishes.
+
+DEFAULT_SWEEP = {
+    "weapons": ["Pistol", "Shotgun", "Rifle", "Rocket Launcher"],
+    "levels": [1, 2],
+    "enemy_mixes": [None, {"basic": 10}, {"basic": 5, "flying": 5}],
+    "enemy_stats": [{}],
+    "seeds": 4,
+    "policy": "bot",
+    "max_frames": 3600,
+}
+
+# Pool workers run many games, so stat overrides are undone between runs
+BASE_ENEMY_TYPES = copy.deepcopy(ENEMY_TYPES)
+
+RESULT_FIELDS = ["weapon", "level", "enemy_mix", "enemy_stats", "seed", "policy", "cleared",
+                 "time_to_clear", "damage_taken", "deaths", "coins", "score",
+                 "frames", "frames_per_sec"]
+
+class BotInput:
+    # Plays by chasing the nearest enemy and firing whenever it lines up
+    def __init__(self, game, seed):
+        self.game = game
+        self.rng = random.Random(seed)
+        self.keys = KeyState()
+        self.events = []
+    
+    def poll(self):
+        game = self.game
+        player = game.player
+        store = game.enemy_store
+        pressed = []
+        self.events = []
+        if store.count:
+            dx = store.x[:store.count] - player.x
+            dy = store.y[:store.count] - player.y
+            target = int((dx * dx + dy * dy).argmin())
+            tx, ty = float(dx[target]), float(dy[target])
+            
+            # Keep some distance, but always face the target
+            if abs(tx) > 200:
+                pressed.append(pygame.K_d if tx > 0 else pygame.K_a)
+            elif abs(tx) < 80:
+                pressed.append(pygame.K_a if tx > 0 else pygame.K_d)
+            if (tx > 0) != player.facing_right and not pressed:
+                pressed.append(pygame.K_d if tx > 0 else pygame.K_a)
+            if ty < -80 or self.rng.random() < 0.01:
+                pressed.append(pygame.K_w)
+            if abs(ty) < 60 and player.shoot_cooldown <= 0:
+                self.events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+        self.keys = KeyState(pressed)
+
+class IdleInput:
+    def __init__(self, game, seed):
+        self.keys = KeyState()
+        self.events = []
+    
+    def poll(self):
+        pass
+
+def apply_enemy_mix(game, mix, rng):
+    # Replaces the level's spawn table with a fixed mix spread over the level.
+    # Mixed enemies get spawn ids past the level's own, so kills are
+    # tracked and a respawn doesn't bring them back to pay out again.
+    # Clearing the store drops the boss too, and it isn't part of the spawn
+    # table, so a boss level gets a fresh one.
+    level = game.level
+    level.killed.update(range(level.enemy_total))
+    game.enemy_store.clear()
+    if hasattr(game, 'boss'):
+        game.spawn_boss()
+    for enemy_type, count in mix.items():
+        for _ in range(count):
+            y = 600 if enemy_type == "basic" else rng.uniform(200, 500)
+            enemy = Enemy(game, rng.uniform(300, level.width - 50), y, enemy_type)
+            enemy.spawn_id = level.enemy_total
+            level.enemy_total += 1
+
+def run_one(params):
+    # Overrides land in this worker's copy of the archetype table
+    for enemy_type, stats in BASE_ENEMY_TYPES.items():
+        ENEMY_TYPES[enemy_type].update(stats)
+    for enemy_type, overrides in params.get("enemy_stats", {}).items():
+        ENEMY_TYPES[enemy_type].update(overrides)
+    
+    policy = params["policy"]
+    seed = params["seed"]
+    if policy not in ("bot", "idle"):
+        seed = read_seed(policy)
+    game = Game(headless=True, seed=seed)
+    
+    weapon = params["weapon"]
+    if isinstance(weapon, dict):
+        weapon = Weapon(**weapon)
+    else:
+        weapon = next(w for w in game.weapon_shop.weapons if w.name == weapon)
+    game.player.weapons = [weapon]
+    game.player.current_weapon = weapon
+    
+    level = params["level"]
+    if level != game.current_level:
+        game.current_level = level
+        game.load_level(level)
+    if params.get("enemy_mix"):
+        apply_enemy_mix(game, params["enemy_mix"], random.Random(seed))
+        game.save_checkpoint()
+    
+    if policy == "bot":
+        game.input = BotInput(game, seed)
+    elif policy == "idle":
+        game.input = IdleInput(game, seed)
+    else:
+        game.input = ReplayInput(game, policy)
+    
+    start_time = time.perf_counter()
+    frames = 0
+    max_frames = params["max_frames"]
+    while game.running and frames < max_frames and game.current_level == level:
+        game.step()
+        frames += 1
+    elapsed = time.perf_counter() - start_time
+    
+    cleared = game.current_level != level
+    return {
+        "weapon": weapon.name,
+        "level": level,
+        "enemy_mix": json.dumps(params.get("enemy_mix")),
+        "enemy_stats": json.dumps(params.get("enemy_stats", {})),
+        "seed": seed,
+        "policy": policy,
+        "cleared": cleared,
+        "time_to_clear": frames if cleared else None,
+        "damage_taken": game.player.damage_taken,
+        "deaths": game.deaths,
+        "coins": game.coins,
+        "score": game.score,
+        "frames": frames,
+        "frames_per_sec": round(frames / max(elapsed, 1e-9)),
+    }
+
+def expand(sweep):
+    # Cartesian product of the sweep axes, repeated once per seed
+    seeds = sweep["seeds"]
+    seeds = range(seeds) if isinstance(seeds, int) else seeds
+    for weapon, level, mix, stats, seed in itertools.product(
+            sweep["weapons"], sweep["levels"], sweep["enemy_mixes"], sweep["enemy_stats"], seeds):
+        yield {"weapon": weapon, "level": level, "enemy_mix": mix, "enemy_stats": stats,
+               "seed": seed, "policy": sweep["policy"], "max_frames": sweep["max_frames"]}
+
+def summarize(results):
+    # One row per parameter set, averaged over seeds
+    groups = {}
+    for result in results:
+        key = (result["weapon"], result["level"], result["enemy_mix"], result["enemy_stats"])
+        groups.setdefault(key, []).append(result)
+    
+    rows = []
+    for (weapon, level, mix, stats), runs in sorted(groups.items(), key=lambda item: str(item[0])):
+        cleared = [r["time_to_clear"] for r in runs if r["cleared"]]
+        rows.append({
+            "weapon": weapon, "level": level, "enemy_mix": mix, "enemy_stats": stats,
+            "runs": len(runs),
+            "clear_rate": len(cleared) / len(runs),
+            "mean_time_to_clear": sum(cleared) / len(cleared) if cleared else None,
+            "mean_damage_taken": sum(r["damage_taken"] for r in runs) / len(runs),
+            "mean_coins": sum(r["coins"] for r in runs) / len(runs),
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless balancing sweeps across all cores")
+    parser.add_argument("sweep", nargs="?", help="JSON sweep spec (defaults to a built-in sweep)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--csv", metavar="PATH", help="also write every run to a CSV file")
+    args = parser.parse_args()
+    
+    sweep = dict(DEFAULT_SWEEP)
+    if args.sweep:
+        with open(args.sweep) as f:
+            sweep.update(json.load(f))
+    jobs = list(expand(sweep))
+    print(f"Running {len(jobs)} games on {args.workers} workers")
+    
+    results = []
+    writer = None
+    csv_file = open(args.csv, "w", newline="") if args.csv else None
+    if csv_file:
+        writer = csv.DictWriter(csv_file, RESULT_FIELDS)
+        writer.writeheader()
+    
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(run_one, job) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if writer:
+                    writer.writerow(result)
+                print(f"[{len(results)}/{len(jobs)}] {result['weapon']:<16} level {result['level']} "
+                      f"mix {result['enemy_mix']:<28} seed {result['seed']:<3} "
+                      f"clear {str(result['time_to_clear']):>6} dmg {result['damage_taken']:>6.0f} "
+                      f"coins {result['coins']:>4} {result['frames_per_sec']:>6} f/s")
+    finally:
+        if csv_file:
+            csv_file.close()
+    elapsed = time.perf_counter() - start
+    
+    total_frames = sum(r["frames"] for r in results)
+    print(f"\n{len(results)} runs, {total_frames} frames in {elapsed:.1f}s "
+          f"({total_frames / max(elapsed, 1e-9):.0f} frames/s overall)\n")
+    print(f"{'weapon':<16}{'lvl':>4} {'enemy mix':<28}{'runs':>5}{'clear':>7}{'frames':>8}"
+          f"{'dmg':>8}{'coins':>7}  enemy stats")
+    for row in summarize(results):
+        mean_clear = row["mean_time_to_clear"]
+        print(f"{row['weapon']:<16}{row['level']:>4} {row['enemy_mix']:<28}{row['runs']:>5}"
+              f"{row['clear_rate']:>7.0%}{str(mean_clear and round(mean_clear)):>8}"
+              f"{row['mean_damage_taken']:>8.1f}{row['mean_coins']:>7.1f}  {row['enemy_stats']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
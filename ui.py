@@ -1,4 +1,38 @@
 import pygame
+from collections import OrderedDict
+
+class TextCache:
+    # Fonts are created once per size and rendered text is kept in an LRU
+    # keyed by (font size, text, color), so unchanged labels are never
+    # rasterized twice
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+    
+    def font(self, size):
+        # pygame's bundled default font, which is what SysFont(None) gives,
+        # without SysFont's scan of the system's fonts
+        font = self.fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(None, size)
+            self.fonts[size] = font
+        return font
+    
+    def render(self, size, text, color):
+        key = (size, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        surface = self.font(size).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
 
 class HealthBar:
     def __init__(self, x, y, width, height, max_health):
@@ -22,72 +56,84 @@ class HealthBar:
 class UIManager:
     def __init__(self, game):
         self.game = game
-        self.font = pygame.font.SysFont(None, 36)
+        self.text = TextCache()
         
         # Health bars
         self.player_health_bar = HealthBar(20, 20, 200, 20, self.game.player.max_health)
         
         # Boss health bar (only shown during boss fights)
         self.boss_health_bar = None
-    
-    def draw(self, screen):
-        # Player health
-        self.player_health_bar.update(self.game.player.health)
-        self.player_health_bar.draw(screen)
         
-        # Coins
-        coin_text = self.font.render(f"Coins: {self.game.coins}", True, (255, 215, 0))
-        screen.blit(coin_text, (20, 50))
+        # Retained HUD, re-rendered only when the values it shows change
+        self.hud_surface = pygame.Surface((self.game.screen_width, 140), pygame.SRCALPHA)
+        self.hud_state = None
+        self.pause_surface = None
+    
+    def _hud_state(self):
+        game = self.game
+        weapon = game.player.current_weapon
+        boss = getattr(game, 'boss', None)
+        return (game.player.health, game.coins, game.score, game.current_level,
+                weapon.name, weapon.upgrade_level, boss.health if boss else None)
+    
+    def _render_hud(self, state):
+        health, coins, score, level, weapon_name, weapon_level, boss_health = state
+        hud = self.hud_surface
+        hud.fill((0, 0, 0, 0))
         
-        # Score
-        score_text = self.font.render(f"Score: {self.game.score}", True, (255, 255, 255))
-        screen.blit(score_text, (20, 80))
+        # Player health
+        self.player_health_bar.update(health)
+        self.player_health_bar.draw(hud)
         
-        # Level
-        level_text = self.font.render(f"Level: {self.game.current_level}", True, (255, 255, 255))
-        screen.blit(level_text, (20, 110))
+        # Coins, score and level
+        hud.blit(self.text.render(36, f"Coins: {coins}", (255, 215, 0)), (20, 50))
+        hud.blit(self.text.render(36, f"Score: {score}", (255, 255, 255)), (20, 80))
+        hud.blit(self.text.render(36, f"Level: {level}", (255, 255, 255)), (20, 110))
         
         # Weapon info
-        weapon_text = self.font.render(
-            f"Weapon: {self.game.player.current_weapon.name} (Lvl {self.game.player.current_weapon.upgrade_level})", 
-            True, (200, 200, 200))
-        screen.blit(weapon_text, (500, 20))
+        hud.blit(self.text.render(36, f"Weapon: {weapon_name} (Lvl {weapon_level})",
+                                  (200, 200, 200)), (500, 20))
         
         # Boss health (if active)
-        if hasattr(self.game, 'boss'):
+        if boss_health is not None:
             if not self.boss_health_bar:
                 self.boss_health_bar = HealthBar(300, 20, 600, 30, self.game.boss.max_health)
-            self.boss_health_bar.update(self.game.boss.health)
-            self.boss_health_bar.draw(screen)
+            self.boss_health_bar.update(boss_health)
+            self.boss_health_bar.draw(hud)
         
         # Shop button
-        pygame.draw.rect(screen, (100, 100, 200), (1100, 20, 150, 40))
-        shop_text = self.font.render("SHOP (E)", True, (255, 255, 255))
-        screen.blit(shop_text, (1110, 30))
+        pygame.draw.rect(hud, (100, 100, 200), (1100, 20, 150, 40))
+        hud.blit(self.text.render(36, "SHOP (E)", (255, 255, 255)), (1110, 30))
     
-    def draw_pause_menu(self):
+    def draw(self, screen):
+        state = self._hud_state()
+        if state != self.hud_state:
+            self._render_hud(state)
+            self.hud_state = state
+        screen.blit(self.hud_surface, (0, 0))
+    
+    def _render_pause_menu(self):
         # Semi-transparent overlay
-        overlay = pygame.Surface((self.game.screen_width, self.game.screen_height), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
-        self.game.screen.blit(overlay, (0, 0))
+        menu = pygame.Surface((self.game.screen_width, self.game.screen_height), pygame.SRCALPHA)
+        menu.fill((0, 0, 0, 180))
         
         # Menu box
-        pygame.draw.rect(self.game.screen, (50, 50, 80), (440, 240, 400, 300))
+        pygame.draw.rect(menu, (50, 50, 80), (440, 240, 400, 300))
         
         # Title
-        title_font = pygame.font.SysFont(None, 72)
-        title = title_font.render("PAUSED", True, (255, 255, 255))
-        self.game.screen.blit(title, (520, 260))
-        
-        # Buttons
-        button_font = pygame.font.SysFont(None, 48)
+        menu.blit(self.text.render(72, "PAUSED", (255, 255, 255)), (520, 260))
         
         # Resume button
-        pygame.draw.rect(self.game.screen, (100, 200, 100), (490, 350, 300, 60))
-        resume_text = button_font.render("RESUME", True, (255, 255, 255))
-        self.game.screen.blit(resume_text, (550, 365))
+        pygame.draw.rect(menu, (100, 200, 100), (490, 350, 300, 60))
+        menu.blit(self.text.render(48, "RESUME", (255, 255, 255)), (550, 365))
         
         # Quit button
-        pygame.draw.rect(self.game.screen, (200, 100, 100), (490, 430, 300, 60))
-        quit_text = button_font.render("QUIT", True, (255, 255, 255))
-        self.game.screen.blit(quit_text, (580, 445))
\ No newline at end of file
+        pygame.draw.rect(menu, (200, 100, 100), (490, 430, 300, 60))
+        menu.blit(self.text.render(48, "QUIT", (255, 255, 255)), (580, 445))
+        return menu
+    
+    def draw_pause_menu(self):
+        # The pause menu never changes, so it is built once
+        if self.pause_surface is None:
+            self.pause_surface = self._render_pause_menu()
+        self.game.screen.blit(self.pause_surface, (0, 0))
@@ -1,4 +1,6 @@
+import numpy as np
 import pygame
+from game.render import LAYER_BULLETS
 
 class Weapon:
     def __init__(self, name, damage, speed, cooldown, bullet_size=10, bullet_color=(255, 255, 0)):
@@ -14,9 +16,8 @@ class Weapon:
     def shoot(self, game, x, y, facing_right):
         direction = 1 if facing_right else -1
         bullet_x = x + 40 if facing_right else x - 10
-        bullet = Projectile(bullet_x, y + 25, direction * self.speed, 0, 
-                           self.damage, self.bullet_size, self.bullet_color)
-        game.projectiles.append(bullet)
+        game.projectiles.spawn(bullet_x, y + 25, direction * self.speed, 0,
+                               self.damage, self.bullet_size, self.bullet_color)
     
     def upgrade(self):
         self.upgrade_level += 1
@@ -24,88 +25,188 @@ class Weapon:
         self.cooldown = max(5, self.cooldown - 2)
         self.price = 100 * self.upgrade_level
 
-class Projectile:
-    def __init__(self, x, y, vel_x, vel_y, damage, size, color):
-        self.x, self.y = x, y
-        self.vel_x, self.vel_y = vel_x, vel_y
-        self.damage = damage
-        self.size = size
-        self.color = color
-        self.lifetime = 180  # Frames before disappearing
+class ProjectilePool:
+    # Struct-of-arrays storage for every live bullet. Slots [0, count) are
+    # live; dead bullets are swap-removed so the live range stays packed.
+    def __init__(self, capacity=1024, cell_size=128):
+        self.capacity = capacity
+        self.count = 0
+        self.cell_size = cell_size
+        
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vel_x = np.zeros(capacity, dtype=np.float32)
+        self.vel_y = np.zeros(capacity, dtype=np.float32)
+        self.damage = np.zeros(capacity, dtype=np.float32)
+        self.lifetime = np.zeros(capacity, dtype=np.int32)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.int32)
+        
+        # Colors are stored once and referenced by index
+        self.palette = []
+        self.palette_index = {}
+        
+        # Sorted cell keys for the broadphase, rebuilt in update()
+        self.cell_keys = np.zeros(0, dtype=np.int64)
+        self.cell_order = np.zeros(0, dtype=np.intp)
     
-    def update(self):
-        self.x += self.vel_x
-        self.y += self.vel_y
-        self.lifetime -= 1
+    def _arrays(self):
+        return (self.x, self.y, self.vel_x, self.vel_y,
+                self.damage, self.lifetime, self.size, self.color)
     
-    def draw(self, screen):
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.size)
-
-class WeaponShop:
-    def __init__(self, game):
-        self.game = game
-        self.weapons = [
-            Weapon("Pistol", 10, 10, 20),
-            Weapon("Shotgun", 15, 8, 30, 15, (255, 150, 0)),
-            Weapon("Rifle", 8, 15, 10, 5, (0, 255, 255)),
-            Weapon("Rocket Launcher", 30, 5, 60, 20, (255, 0, 0))
-        ]
-        self.active = False
-    
-    def toggle_shop(self):
-        self.active = not self.active
-    
-    def buy_weapon(self, weapon_index):
-        weapon = self.weapons[weapon_index]
-        if self.game.coins >= weapon.price:
-            self.game.coins -= weapon.price
-            self.game.player.weapons.append(weapon)
-            self.game.player.current_weapon = weapon
-            return True
-        return False
-    
-    def upgrade_weapon(self, weapon_index):
-        if weapon_index < len(self.game.player.weapons):
-            weapon = self.game.player.weapons[weapon_index]
-            if self.game.coins >= weapon.price:
-                self.game.coins -= weapon.price
-                weapon.upgrade()
-                return True
-        return False
-    
-    def draw(self, screen):
-        if not self.active:
-            return
+    def _grow(self):
+        self.capacity *= 2
+        for name in ("x", "y", "vel_x", "vel_y", "damage", "lifetime", "size", "color"):
+            old = getattr(self, name)
+            new = np.zeros(self.capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+    
+    def color_index(self, color):
+        index = self.palette_index.get(color)
+        if index is None:
+            index = len(self.palette)
+            self.palette.append(color)
+            self.palette_index[color] = index
+        return index
+    
+    def spawn(self, x, y, vel_x, vel_y, damage, size, color, lifetime=180):
+        if self.count == self.capacity:
+            self._grow()
+        i = self.count
+        self.x[i], self.y[i] = x, y
+        self.vel_x[i], self.vel_y[i] = vel_x, vel_y
+        self.damage[i] = damage
+        self.lifetime[i] = lifetime
+        self.size[i] = size
+        self.color[i] = self.color_index(color)
+        self.count += 1
+    
+    def spawn_many(self, x, y, vel_x, vel_y, damage, size, color, lifetime=180):
+        # Appends a whole volley; velocities are arrays and the rest may be
+        # arrays or scalars
+        count = len(vel_x)
+        while self.count + count > self.capacity:
+            self._grow()
+        new = slice(self.count, self.count + count)
+        self.x[new], self.y[new] = x, y
+        self.vel_x[new], self.vel_y[new] = vel_x, vel_y
+        self.damage[new] = damage
+        self.lifetime[new] = lifetime
+        self.size[new] = size
+        self.color[new] = self.color_index(color)
+        self.count += count
+    
+    def clear(self):
+        self.count = 0
+        self.cell_keys = self.cell_keys[:0]
+        self.cell_order = self.cell_order[:0]
+    
+    def __len__(self):
+        return self.count
+    
+    def update(self, bounds):
+        n = self.count
+        if n:
+            x, y = self.x[:n], self.y[:n]
+            x += self.vel_x[:n]
+            y += self.vel_y[:n]
+            self.lifetime[:n] -= 1
             
-        # Draw shop background
-        pygame.draw.rect(screen, (50, 50, 80), (300, 200, 680, 320))
+            # Expire and cull off-screen bullets in one pass
+            left, top, right, bottom = bounds
+            size = self.size[:n]
+            alive = ((self.lifetime[:n] > 0) &
+                     (x + size >= left) & (x - size <= right) &
+                     (y + size >= top) & (y - size <= bottom))
+            self.compact(alive)
+        self.build_grid()
+    
+    def compact(self, alive):
+        # Swap-remove: holes in the surviving range are filled with the live
+        # bullets that sit past it, so only dead slots are touched
+        n = self.count
+        live = int(np.count_nonzero(alive))
+        if live == n:
+            return
+        holes = np.flatnonzero(~alive[:live])
+        movers = np.flatnonzero(alive[live:n]) + live
+        for array in self._arrays():
+            array[holes] = array[movers]
+        self.count = live
+    
+    def remove_dead(self):
+        n = self.count
+        if n:
+            self.compact(self.lifetime[:n] > 0)
+    
+    def build_grid(self):
+        n = self.count
+        cell = self.cell_size
+        cx = (self.x[:n] // cell).astype(np.int64)
+        cy = (self.y[:n] // cell).astype(np.int64)
+        keys = (cx << 32) + cy
+        self.cell_order = np.argsort(keys, kind="stable")
+        self.cell_keys = keys[self.cell_order]
+    
+    def query(self, x, y, width, height):
+        # Indices of live bullets whose path this frame overlaps the box
+        n = self.count
+        if not n or len(self.cell_keys) != n:
+            return np.zeros(0, dtype=np.intp)
         
-        # Draw title
-        font = pygame.font.SysFont(None, 48)
-        title = font.render("WEAPON SHOP", True, (255, 255, 255))
-        screen.blit(title, (500, 220))
+        # Bullets are bucketed by centre, so widen the box by the largest
+        # radius and per-frame travel before picking cells
+        pad = float(self.size[:n].max()) + float(max(np.abs(self.vel_x[:n]).max(),
+                                                     np.abs(self.vel_y[:n]).max()))
+        cell = self.cell_size
+        x0, y0 = int((x - pad) // cell), int((y - pad) // cell)
+        x1, y1 = int((x + width + pad) // cell), int((y + height + pad) // cell)
+        cxs = np.arange(x0, x1 + 1, dtype=np.int64)
+        cys = np.arange(y0, y1 + 1, dtype=np.int64)
+        wanted = ((cxs[:, None] << 32) + cys[None, :]).ravel()
         
-        # Draw coins
-        coin_text = font.render(f"Coins: {self.game.coins}", True, (255, 215, 0))
-        screen.blit(coin_text, (320, 220))
+        starts = np.searchsorted(self.cell_keys, wanted, "left")
+        ends = np.searchsorted(self.cell_keys, wanted, "right")
+        if not (ends - starts).any():
+            return np.zeros(0, dtype=np.intp)
+        candidates = self.cell_order[np.concatenate(
+            [np.arange(a, b) for a, b in zip(starts.tolist(), ends.tolist()) if b > a])]
         
-        # Draw weapons for sale
-        font = pygame.font.SysFont(None, 36)
-        for i, weapon in enumerate(self.weapons):
-            y_pos = 270 + i * 60
-            color = (0, 255, 0) if self.game.coins >= weapon.price else (255, 0, 0)
-            
-            weapon_text = font.render(
-                f"{weapon.name} - Damage: {weapon.damage} - Cooldown: {weapon.cooldown} - Price: {weapon.price}", 
-                True, color)
-            screen.blit(weapon_text, (320, y_pos))
-            
-            # Draw buy button
-            pygame.draw.rect(screen, (100, 100, 150), (900, y_pos, 60, 30))
-            buy_text = font.render("Buy", True, (255, 255, 255))
-            screen.blit(buy_text, (910, y_pos))
-        
-        # Draw close button
-        pygame.draw.rect(screen, (200, 50, 50), (500, 500, 120, 40))
-        close_text = font.render("CLOSE", True, (255, 255, 255))
-        screen.blit(close_text, (530, 510))
\ No newline at end of file
+        # Exact test against the swept bounding box of each candidate
+        left, top, box_width, box_height = self.swept_boxes(candidates)
+        hit = ((left < x + width) & (left + box_width > x) &
+               (top < y + height) & (top + box_height > y) &
+               (self.lifetime[candidates] > 0))
+        return candidates[hit]
+    
+    def swept_boxes(self, indices=None):
+        # (x, y, width, height) arrays covering each bullet's path this frame
+        if indices is None:
+            indices = slice(0, self.count)
+        px, py = self.x[indices], self.y[indices]
+        vx, vy = self.vel_x[indices], self.vel_y[indices]
+        size = self.size[indices]
+        left = np.minimum(px, px - vx) - size
+        top = np.minimum(py, py - vy) - size
+        return left, top, np.abs(vx) + size * 2, np.abs(vy) + size * 2
+    
+    def rects(self, offset=(0, 0)):
+        n = self.count
+        return [pygame.Rect(x - size, y - size, size * 2 + 1, size * 2 + 1)
+                for x, y, size in zip((self.x[:n] - offset[0]).astype(np.int32).tolist(),
+                                      (self.y[:n] - offset[1]).astype(np.int32).tolist(),
+                                      self.size[:n].tolist())]
+    
+    def draw(self, queue):
+        # One tinted, pre-scaled bullet sprite per size and color
+        # Bullets fly straight, so their last tick is one step back along
+        # their velocity
+        n = self.count
+        x = queue.lerp(self.x[:n] - self.vel_x[:n], self.x[:n])
+        y = queue.lerp(self.y[:n] - self.vel_y[:n], self.y[:n])
+        sizes, colors = self.size[:n], self.color[:n]
+        for size, color in set(zip(sizes.tolist(), colors.tolist())):
+            sprite = queue.assets.get("bullet", (size * 2 + 1, size * 2 + 1), tint=self.palette[color])
+            same = (sizes == size) & (colors == color)
+            queue.submit_many(LAYER_BULLETS, sprite, x[same] - size, y[same] - size)